@@ -0,0 +1,128 @@
+"""Texture atlas for the per-frame PNGs in images/.
+
+Build the atlas (re-run whenever a PNG in images/ changes):
+
+    python atlas.py
+
+This packs every image into atlas/atlas.png and writes atlas/atlas.json,
+which maps each image name (as pgzero names it, e.g. 'player/player_up_0')
+to its [x, y, width, height] rectangle in the atlas.
+"""
+import json
+import os
+
+import pygame
+
+from sprite_registry import IMAGE_ROOT
+
+ATLAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "atlas")
+ATLAS_IMAGE = os.path.join(ATLAS_DIR, "atlas.png")
+ATLAS_INDEX = os.path.join(ATLAS_DIR, "atlas.json")
+
+# Maximum width of a packed row, and empty pixels kept around every image
+ATLAS_WIDTH = 512
+PADDING = 1
+
+
+def find_images(image_root=IMAGE_ROOT):
+    """Map image names to PNG paths for every image under image_root"""
+    found = {}
+    for folder, _, files in os.walk(image_root):
+        for file_name in files:
+            if file_name.endswith(".png"):
+                path = os.path.join(folder, file_name)
+                name = os.path.relpath(path, image_root)[:-len(".png")]
+                found[name.replace(os.sep, "/")] = path
+    return found
+
+
+def pack(sizes, atlas_width=ATLAS_WIDTH, padding=PADDING):
+    """Shelf-pack named (width, height) sizes.
+
+    Returns ({name: (x, y, width, height)}, (atlas_width, atlas_height)).
+    Images are placed tallest first, left to right, starting a new row
+    whenever the current one is full.
+    """
+    rects = {}
+    x = y = row_height = 0
+    used_width = 0
+    for name in sorted(sizes, key=lambda n: (-sizes[n][1], n)):
+        width, height = sizes[name]
+        if x + width + padding > atlas_width and x > 0:
+            x = 0
+            y += row_height
+            row_height = 0
+        rects[name] = (x, y, width, height)
+        x += width + padding
+        used_width = max(used_width, x)
+        row_height = max(row_height, height + padding)
+    return rects, (used_width, y + row_height)
+
+
+def build_atlas(image_root=IMAGE_ROOT, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX):
+    """Pack every PNG under image_root into one atlas image plus an index file"""
+    images = {name: pygame.image.load(path) for name, path in find_images(image_root).items()}
+    rects, size = pack({name: image.get_size() for name, image in images.items()})
+
+    atlas = pygame.Surface(size, pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    for name, (x, y, width, height) in rects.items():
+        atlas.blit(images[name], (x, y))
+
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    pygame.image.save(atlas, image_path)
+    # One image per line keeps the index readable and diff-friendly
+    entries = [f"  {json.dumps(name)}: {json.dumps(list(rects[name]))}" for name in sorted(rects)]
+    with open(index_path, "w") as f:
+        f.write("{\n" + ",\n".join(entries) + "\n}\n")
+    return rects, size
+
+
+class TextureAtlas:
+    """One atlas surface serving every image as a subsurface view"""
+
+    def __init__(self, surface, rects):
+        self.surface = surface
+        self.rects = rects
+        self.views = {}
+
+    @staticmethod
+    def is_built(image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX):
+        return os.path.exists(image_path) and os.path.exists(index_path)
+
+    @classmethod
+    def load(cls, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, surface=None):
+        """Load a built atlas, or return None if it hasn't been built
+
+        surface is the atlas image if it has already been loaded (e.g. by the
+        asset preloader), so only the index is read.
+        """
+        if not cls.is_built(image_path, index_path):
+            return None
+        with open(index_path) as f:
+            rects = {name: tuple(rect) for name, rect in json.load(f).items()}
+        if surface is None:
+            surface = pygame.image.load(image_path)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+        return cls(surface, rects)
+
+    def __contains__(self, name):
+        return name in self.rects
+
+    def get(self, name):
+        """Subsurface view of one image - shares pixels with the atlas"""
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = self.surface.subsurface(self.rects[name])
+        return view
+
+    def preload_into(self, loader):
+        """Seed a pgzero image loader so name lookups (e.g. Actor('gem')) use the atlas"""
+        for name in self.rects:
+            loader.cache[loader.cache_key(name, (), {})] = self.get(name)
+
+
+if __name__ == "__main__":
+    rects, size = build_atlas()
+    print(f"Packed {len(rects)} images into a {size[0]}x{size[1]} atlas: {ATLAS_IMAGE}")
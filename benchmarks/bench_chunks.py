@@ -0,0 +1,150 @@
+"""Chunked world benchmark: a long walk across a 100,000 x 100,000 cell level read from a chunk file.
+
+Creates the level as a sparse chunk file, writes generated chunks along
+a corridor on row 2 (walls, gems, a clear path) and leaves the rest as
+never-written floor. The player then walks right along the corridor,
+headless, crossing a chunk border every CHUNK_SIZE cells, with the
+enemies removed so nothing ends the run. The file's pages are dropped
+from the OS cache before each walk, so chunks really come from disk.
+
+The walk runs twice: with chunks read ahead around the player (as the
+game does), and with read-ahead limited to the player's own chunk. For
+each it reports tick times - overall and on the ticks that loaded a chunk
+on crossing a border - chunks loaded and evicted, gems picked up and how
+much resident memory grew over the walk. (Tick time outliers of a few
+milliseconds that show up with or without chunks are scheduling noise.)
+
+Run from the repository root:
+
+    python benchmarks/bench_chunks.py
+    python benchmarks/bench_chunks.py --cells 20000 --budget 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import world as world_module
+from chunks import create_level_file, ChunkFile, open_level, CHUNK_SIZE, CHUNK_BUDGET, PREFETCH_MARGIN
+from direction import RIGHT
+from world import GameWorld, CELL_SIZE, PLAYER_START
+
+LEVEL_SIZE = 100000
+
+
+def resident_kib():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def build_level(path, size, walk_cells, seed):
+    """Sparse size x size chunk file with generated chunks along the corridor"""
+    create_level_file(path, size, size)
+    chunk_file = ChunkFile(path, writable=True)
+    rng = np.random.default_rng(seed)
+    start_x, corridor_y = PLAYER_START
+    for chunk_x in range((start_x + walk_cells + PREFETCH_MARGIN) // CHUNK_SIZE + 1):
+        cells = np.where(rng.random((CHUNK_SIZE, CHUNK_SIZE)) < 0.2, np.uint8(1), np.uint8(0))
+        cells[rng.random((CHUNK_SIZE, CHUNK_SIZE)) < 0.03] = 2
+        cells[0] = 1  # Top border
+        cells[corridor_y - 1:corridor_y + 2] = 0
+        cells[corridor_y, ::7] = 2  # A gem every few cells along the way
+        if chunk_x == 0:
+            cells[:, 0] = 1
+            cells[1:10, 1:13] = 0  # Room around the starting cells
+        chunk_file.write_chunk(chunk_x, 0, cells)
+    chunk_file.close()
+
+
+def drop_page_cache(path):
+    """Evict the file from the OS cache, so the next reads hit the disk"""
+    if hasattr(os, "posix_fadvise"):
+        with open(path, "rb") as level_file:
+            os.fsync(level_file.fileno())
+            os.posix_fadvise(level_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def walk(path, cells, budget, prefetch_margin):
+    """Walk the corridor; returns a dict of results"""
+    drop_page_cache(path)
+    world_module.PREFETCH_MARGIN = prefetch_margin
+    level = open_level(path, budget)
+    height, width = level.shape
+    world = GameWorld(level, width=width * CELL_SIZE, height=height * CELL_SIZE, seed=1)
+    world.enemies.clear()  # Only the map is being measured
+    world.step()  # Reads the starting chunk
+
+    # Filled up front, so recording tick times doesn't grow the resident memory being measured
+    tick_times = np.ones((cells + 1) * 2 * -(-CELL_SIZE // world.player.move_speed))
+    load_times = []
+    ticks = 0
+    goal_x = (PLAYER_START[0] + cells) * CELL_SIZE
+    before = resident_kib()
+    while world.player.x < goal_x:
+        if not world.player.is_moving:
+            world.move_player(RIGHT)
+        loaded = world.game_map.loaded
+        start = time.perf_counter()
+        world.step()
+        elapsed = time.perf_counter() - start
+        tick_times[ticks] = elapsed
+        ticks += 1
+        if world.game_map.loaded != loaded:
+            load_times.append(elapsed)
+
+    tick_times = tick_times[:ticks] * 1000
+    load_times = np.array(load_times or [0]) * 1000
+    return {
+        "ticks": len(tick_times),
+        "mean_ms": tick_times.mean(),
+        "p99_ms": np.percentile(tick_times, 99),
+        "max_ms": tick_times.max(),
+        "load_ticks": len(load_times),
+        "load_mean_ms": load_times.mean(),
+        "load_max_ms": load_times.max(),
+        "loaded": world.game_map.loaded,
+        "evicted": world.game_map.evicted,
+        "gems": world.collected,
+        "rss_kib": resident_kib() - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=LEVEL_SIZE, help="level side in cells")
+    parser.add_argument("--cells", type=int, default=5000, help="cells to walk")
+    parser.add_argument("--budget", type=int, default=CHUNK_BUDGET, help="chunks kept in memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "level.chunks")
+        start = time.perf_counter()
+        build_level(path, args.size, args.cells, seed=1)
+        disk_kib = os.stat(path).st_blocks // 2
+        print(f"{args.size}x{args.size} level: {os.path.getsize(path) / 2 ** 30:.1f} GiB file, "
+              f"{disk_kib} KiB on disk, written in {time.perf_counter() - start:.2f} s")
+        print(f"Walking {args.cells} cells ({args.cells // CHUNK_SIZE} chunk borders), "
+              f"{args.budget} chunks of {CHUNK_SIZE}x{CHUNK_SIZE} in memory at most\n")
+
+        print(f"{'read-ahead':<12}{'ticks':>8}{'mean ms':>9}{'p99 ms':>8}{'max ms':>8}"
+              f"{'load ticks':>12}{'load mean':>11}{'load max':>10}{'loaded':>8}{'evicted':>9}{'gems':>6}"
+              f"{'RSS +KiB':>10}")
+        for label, margin in ((f"{PREFETCH_MARGIN} cells", PREFETCH_MARGIN), ("own chunk", 0)):
+            result = walk(path, args.cells, args.budget, margin)
+            print(f"{label:<12}{result['ticks']:>8}{result['mean_ms']:>9.3f}{result['p99_ms']:>8.3f}"
+                  f"{result['max_ms']:>8.3f}{result['load_ticks']:>12}{result['load_mean_ms']:>11.3f}"
+                  f"{result['load_max_ms']:>10.3f}{result['loaded']:>8}{result['evicted']:>9}{result['gems']:>6}"
+                  f"{result['rss_kib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Dungeon generator benchmark: generation time over map sizes, for both layouts.
+
+For every size and mode it reports the best time of a few runs, the share
+of floor and the number of gems, and checks that the level is valid: the
+border is wall, the player and enemy starting cells are floor and every
+floor and gem cell is in the one region reachable from the player's
+starting cell.
+
+Run from the repository root:
+
+    python benchmarks/bench_dungeon.py
+    python benchmarks/bench_dungeon.py --sizes 256 4096 --seed 3
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from dungeon import generate, floor_regions, run_at, MODES, GEM_DENSITY
+from world import PLAYER_START, ENEMY_STARTS
+
+SIZES = [64, 256, 1024, 2048, 4096]
+
+
+def check_level(level):
+    """Why the level isn't playable, or None if it is"""
+    walls = level == 1
+    if not (walls[[0, -1], :].all() and walls[:, [0, -1]].all()):
+        return "border isn't all wall"
+    if any(walls[grid_y, grid_x] for grid_x, grid_y in [PLAYER_START] + ENEMY_STARTS):
+        return "a starting cell is a wall"
+    run_starts, _, roots = floor_regions(~walls)
+    start_x, start_y = PLAYER_START
+    start_root = roots[run_at(run_starts, start_y * level.shape[1] + start_x)]
+    if (roots != start_root).any():
+        return f"{np.count_nonzero(roots != start_root)} floor runs can't be reached from the start"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="square map sizes in cells")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gem-density", type=float, default=GEM_DENSITY)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'size':>12}{'best ms':>10}{'floor':>8}{'gems':>10}  check")
+    for mode in MODES:
+        for size in args.sizes:
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                level = generate(size, size, args.seed, mode, args.gem_density)
+                times.append(time.perf_counter() - start)
+            problem = check_level(level)
+            print(f"{mode:<6}{f'{size}x{size}':>12}{min(times) * 1000:>10.1f}{np.mean(level != 1):>8.2f}"
+                  f"{np.count_nonzero(level == 2):>10}  {problem or 'ok'}")
+
+
+if __name__ == "__main__":
+    main()
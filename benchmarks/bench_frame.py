@@ -0,0 +1,272 @@
+"""Frame benchmark: the real update() and draw() from main.py, with no window.
+
+Loads main.py the way Pygame Zero does, under the SDL dummy video and
+audio drivers, and times update(), draw() and present() frame by frame
+while sweeping the number of enemies, the number of gems and the map
+size. The scroll sweep plays levels whose play area is the whole map,
+with the player walking in the middle so the camera scrolls every
+frame, and grows the swarm and the gems with the map - the draw time
+should stay flat, since only what's in view is drawn. For each scenario
+it reports mean, p95 and p99 milliseconds and the memory allocated per
+frame, and writes everything to a JSON file so runs can be compared.
+
+Run from the repository root:
+
+    python benchmarks/bench_frame.py                      # writes bench_frame.json
+    python benchmarks/bench_frame.py --compare old.json   # ...and flags scenarios that got slower
+
+Options after -- are passed to main.py, e.g. -- --dirty-rects.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import types
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pygame
+from pgzero.game import PGZeroGame
+from pgzero.runner import prepare_mod
+
+from world import GameWorld, ORIGINAL_MAP, CELL_SIZE, PLAYING
+
+FRAME_TIME = 1 / 60  # Delta time handed to update(), as at 60 frames per second
+WARMUP_FRAMES = 30
+ALLOCATION_FRAMES = 50  # Traced separately - tracemalloc slows every frame down
+MOVE_EVERY = 20  # Frames between simulated key presses
+SLOWER_THRESHOLD = 1.10  # --compare flags scenarios at least this much slower
+
+# (name, enemies as a swarm size on top of the 3 regular enemies, gems, map cells or None for the default map)
+# Swarm enemies only start on free cells, one each, so the enemy sweep plays a whole 128x128 map
+ENEMY_SWEEP = [("enemies", swarm, 100, (128, 128)) for swarm in (0, 100, 1000, 10000)]
+GEM_SWEEP = [("gems", 0, gems, (64, 64)) for gems in (10, 100, 1000)]
+MAP_SWEEP = [("map", 0, 100, (size, size)) for size in (16, 64, 256, 1024)]
+# A swarm enemy per 1000 cells and a gem per 100, so as many are in view at every size
+SCROLL_SWEEP = [("scroll", size * size // 1000, size * size // 100, (size, size)) for size in (64, 256, 1024, 4096)]
+SCENARIOS = ENEMY_SWEEP + GEM_SWEEP + MAP_SWEEP + SCROLL_SWEEP
+
+# Cells the player and the three regular enemies start on, kept free of walls
+START_CELLS = [(2, 2), (5, 5), (10, 3), (8, 8)]
+
+
+def load_game(main_args):
+    """Execute main.py as Pygame Zero would and return the module"""
+    sys.argv = [MAIN] + main_args
+    sys._pgzrun = True  # main.py's game_loop.go() returns instead of running the loop
+    os.chdir(ROOT)
+
+    game_module = types.ModuleType("main")
+    game_module.__file__ = MAIN
+    sys.modules["main"] = game_module
+    prepare_mod(game_module)
+    # prepare_mod copies pgzero's builtins over the module, including __file__ and __name__
+    game_module.__file__ = MAIN
+    game_module.__name__ = "main"
+    with open(MAIN) as main_file:
+        exec(compile(main_file.read(), MAIN, "exec"), game_module.__dict__)
+
+    PGZeroGame(game_module).reinit_screen()
+    # Let the asset preloader finish so the game is set up at its menu
+    game_module.preloader.wait()
+    game_module.update(FRAME_TIME)
+    return game_module
+
+
+def make_level(width, height, gems, rng):
+    """A bordered level with 15% random walls and the given number of gems on free cells"""
+    level = np.where(rng.random((height, width)) < 0.15, 1, 0).astype(np.uint8)
+    level[[0, -1], :] = 1
+    level[:, [0, -1]] = 1
+    for grid_x, grid_y in START_CELLS:
+        level[grid_y, grid_x] = 0
+
+    # Gems go on free cells inside the playable window area, so the player can reach them
+    free_ys, free_xs = np.nonzero(level[:11, :15] == 0)
+    free = [(x, y) for x, y in zip(free_xs.tolist(), free_ys.tolist()) if (x, y) not in START_CELLS]
+    inside = min(gems, len(free))
+    for index in rng.choice(len(free), inside, replace=False).tolist():
+        level[free[index][1], free[index][0]] = 2
+
+    # The rest go anywhere else on the map
+    free_ys, free_xs = np.nonzero(level == 0)
+    outside = gems - inside
+    chosen = rng.choice(len(free_ys), outside, replace=False)
+    level[free_ys[chosen], free_xs[chosen]] = 2
+    return level
+
+
+def start_scenario(game, swarm, gems, map_cells, scroll=False):
+    """Replace the game's world with the scenario's and switch to PLAYING"""
+    rng = np.random.default_rng(1)
+    level = ORIGINAL_MAP if map_cells is None else make_level(map_cells[0], map_cells[1], gems, rng)
+    if scroll:
+        # The whole map is the play area, and the player walks around the middle of it
+        middle_x, middle_y = map_cells[0] // 2, map_cells[1] // 2
+        level[middle_y:middle_y + 2, middle_x:middle_x + 2] = 0
+        world = GameWorld(level, width=map_cells[0] * CELL_SIZE, height=map_cells[1] * CELL_SIZE,
+                          tick_rate=game.options.logic_rate, seed=1)
+        player = world.player
+        player.x = player.target_x = player.previous_x = middle_x * CELL_SIZE
+        player.y = player.target_y = player.previous_y = middle_y * CELL_SIZE
+    else:
+        world = GameWorld(level, tick_rate=game.options.logic_rate, seed=1)
+    if swarm:
+        world.spawn_swarm(swarm)
+    # Enough health to survive the whole run, so every frame exercises the playing screen
+    world.player.health = 10 ** 9
+
+    game.world = world
+    game.map_tiles.clear()
+    game.attach_sprites()
+    game.timestep.reset()
+    game.game_state = game.previous_game_state = PLAYING
+
+
+def press_key(game, frame):
+    """Walk the player around in a fixed pattern"""
+    if frame % MOVE_EVERY == 0:
+        pattern = [game.keys.RIGHT, game.keys.DOWN, game.keys.LEFT, game.keys.UP]
+        game.on_key_down(pattern[(frame // MOVE_EVERY) % len(pattern)])
+
+
+def run_frames(game, scenario, count, timings=None):
+    """Run count frames, restarting the scenario if the run ends; returns the frames run"""
+    for frame in range(count):
+        if game.game_state != PLAYING:
+            start_scenario(game, *scenario)
+        press_key(game, frame)
+
+        start = time.perf_counter()
+        game.update(FRAME_TIME)
+        updated = time.perf_counter()
+        game.draw()
+        game.present()
+        end = time.perf_counter()
+
+        if timings is not None:
+            timings["update"].append(updated - start)
+            timings["draw"].append(end - updated)
+            timings["frame"].append(end - start)
+
+
+def summary(seconds):
+    milliseconds = np.array(seconds) * 1000
+    return {
+        "mean": round(float(milliseconds.mean()), 4),
+        "p95": round(float(np.percentile(milliseconds, 95)), 4),
+        "p99": round(float(np.percentile(milliseconds, 99)), 4),
+    }
+
+
+def measure_allocations(game, scenario):
+    """Mean KiB allocated per frame (the peak above the frame's starting point) and net growth"""
+    tracemalloc.start()
+    peaks = []
+    start_size, _ = tracemalloc.get_traced_memory()
+    for frame in range(ALLOCATION_FRAMES):
+        if game.game_state != PLAYING:
+            start_scenario(game, *scenario)
+        press_key(game, frame)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        game.update(FRAME_TIME)
+        game.draw()
+        game.present()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "peak_kib_per_frame": round(sum(peaks) / len(peaks) / 1024, 2),
+        "net_kib": round((end_size - start_size) / 1024, 2),
+    }
+
+
+def run_scenario(game, name, swarm, gems, map_cells, frames):
+    scenario = (swarm, gems, map_cells, name in ("enemies", "scroll"))
+    start_scenario(game, *scenario)
+    run_frames(game, scenario, WARMUP_FRAMES)
+
+    timings = {"update": [], "draw": [], "frame": []}
+    run_frames(game, scenario, frames, timings)
+    result = {
+        "name": f"{name}/" + (f"{3 + swarm}-enemies" if name == "enemies" else
+                              f"{gems}-gems" if name == "gems" else f"{map_cells[0]}x{map_cells[1]}"),
+        "enemies": 3 + len(game.world.swarm),
+        "gems": int((game.world.level == 2).sum()),
+        "map": [int(game.world.map_width), int(game.world.map_height)],
+    }
+    for part, seconds in timings.items():
+        result[f"{part}_ms"] = summary(seconds)
+    result["allocations"] = measure_allocations(game, scenario)
+    return result
+
+
+def compare(results, old_path):
+    """Print each scenario's mean frame time against an earlier run"""
+    with open(old_path) as old_file:
+        old = {result["name"]: result for result in json.load(old_file)["results"]}
+    print(f"\nCompared with {old_path}:")
+    for result in results:
+        previous = old.get(result["name"])
+        if previous is None:
+            continue
+        ratio = result["frame_ms"]["mean"] / previous["frame_ms"]["mean"]
+        flag = "  SLOWER" if ratio >= SLOWER_THRESHOLD else ""
+        print(f"  {result['name']:<22} {previous['frame_ms']['mean']:8.3f} -> "
+              f"{result['frame_ms']['mean']:8.3f} ms  ({ratio:.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per scenario")
+    parser.add_argument("--output", default="bench_frame.json", help="JSON results file")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    parser.add_argument("main_args", nargs="*", help="options for main.py (after --)")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+
+    game = load_game(args.main_args)
+
+    results = []
+    print(f"{'scenario':<22} {'frame mean':>10} {'p95':>8} {'p99':>8} {'update':>8} {'draw':>8} {'KiB/frame':>10}")
+    for name, swarm, gems, map_cells in SCENARIOS:
+        result = run_scenario(game, name, swarm, gems, map_cells, args.frames)
+        results.append(result)
+        frame = result["frame_ms"]
+        print(f"{result['name']:<22} {frame['mean']:10.3f} {frame['p95']:8.3f} {frame['p99']:8.3f} "
+              f"{result['update_ms']['mean']:8.3f} {result['draw_ms']['mean']:8.3f} "
+              f"{result['allocations']['peak_kib_per_frame']:10.1f}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "main_args": args.main_args,
+        },
+        "results": results,
+    }
+    with open(output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nWrote {output}")
+
+    if previous:
+        compare(results, previous)
+
+
+if __name__ == "__main__":
+    main()
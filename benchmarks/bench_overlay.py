@@ -0,0 +1,87 @@
+"""Level overlay benchmark: restarts and concurrent worlds on one shared level.
+
+For each map size it generates a dungeon at the generator's gem density,
+collects some of its gems the way a run does, and reports:
+
+- restart: GameWorld.reset_map(), which drops the run's overlay of
+  changed cells, against copying the level as restarts used to
+- reset: the whole GameWorld.reset() a restart runs, and creating a
+  new world on the level (new ms)
+- memory: bytes allocated per extra world playing the same level at
+  once, against the level's own size
+- reads: valid_moves() over the swarm's cells, with no changes yet and
+  after the gems were collected (changed ms)
+
+Run from the repository root:
+
+    python benchmarks/bench_overlay.py
+    python benchmarks/bench_overlay.py --sizes 256 4096 --gems 1000
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from dungeon import generate
+from overlay import base_level
+from world import GameWorld, CELL_SIZE
+
+SIZES = [256, 1024, 4096]
+WORLDS = 8  # Concurrent worlds the memory is averaged over
+SWARM_SIZE = 2000
+
+
+def best_ms(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1000
+
+
+def new_world(level):
+    height, width = level.shape
+    return GameWorld(level, width=width * CELL_SIZE, height=height * CELL_SIZE, seed=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="square map sizes in cells")
+    parser.add_argument("--gems", type=int, default=200, help="gems collected before restarting")
+    args = parser.parse_args()
+
+    print(f"{'size':>12}{'level KiB':>11}{'copy ms':>9}{'restart ms':>12}{'reset ms':>10}{'new ms':>8}"
+          f"{'KiB/world':>11}{'reads ms':>12}{'changed ms':>12}{'changes':>9}")
+    for size in args.sizes:
+        level = base_level(generate(size, size, 1, "bsp"))
+        world = new_world(level)
+        world.spawn_swarm(SWARM_SIZE)
+        xs, ys = world.swarm.x, world.swarm.y
+        clean_ms = best_ms(lambda: world.valid_moves(xs, ys), 200)
+
+        # Collect gems the way a run does, then time the restart that drops them
+        grid_ys, grid_xs = np.nonzero(level == 2)
+        for grid_x, grid_y in zip(grid_xs[:args.gems].tolist(), grid_ys[:args.gems].tolist()):
+            world.collectibles.remove(grid_x, grid_y)
+        changed_ms = best_ms(lambda: world.valid_moves(xs, ys), 200)
+        changes = len(world.game_map.changes)
+        copy_ms = best_ms(lambda: level.copy(), 5)
+        restart_ms = best_ms(world.reset_map, 1000)
+        reset_ms = best_ms(world.reset, 20)
+        new_ms = best_ms(lambda: new_world(level), 20)
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        worlds = [new_world(level) for _ in range(WORLDS)]
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del worlds
+
+        print(f"{f'{size}x{size}':>12}{level.nbytes // 1024:>11}{copy_ms:>9.3f}{restart_ms:>12.4f}"
+              f"{reset_ms:>10.3f}{new_ms:>8.3f}{(after - before) / WORLDS / 1024:>11.1f}{clean_ms:>12.3f}{changed_ms:>12.3f}{changes:>9}")
+
+
+if __name__ == "__main__":
+    main()
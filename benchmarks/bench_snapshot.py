@@ -0,0 +1,63 @@
+"""Snapshot size and save/load time, on the default map and on large random maps.
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py
+"""
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from snapshot import save_snapshot, load_snapshot
+from world import GameWorld
+
+MAP_SIZES = [256, 1024, 2048]
+SWARM_SIZE = 1000
+
+
+def random_level(size, rng):
+    """Square level with a wall border, 20% walls and 5% gems inside"""
+    level = rng.choice(np.array([0, 1, 2], dtype=np.uint8), size=(size, size), p=[0.75, 0.2, 0.05])
+    level[[0, -1], :] = 1
+    level[:, [0, -1]] = 1
+    level[1:4, 1:12] = 0  # Room around the player and enemy starting cells
+    return level
+
+
+def time_call(function, repeat):
+    """Best mean milliseconds per call"""
+    number = max(1, repeat)
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1000
+
+
+def report(name, world):
+    data = save_snapshot(world)
+    repeat = 200 if len(data) < 100000 else 3
+    save_ms = time_call(lambda: save_snapshot(world), repeat)
+    load_ms = time_call(lambda: load_snapshot(data), repeat)
+    print(f"{name:<28} {len(data):>12,} bytes   save {save_ms:9.3f} ms   load {load_ms:9.3f} ms")
+
+
+def main():
+    rng = np.random.default_rng(1)
+
+    world = GameWorld(seed=1)
+    for _ in range(100):
+        world.step()
+    report("default map", world)
+
+    world.spawn_swarm(SWARM_SIZE)
+    report(f"default map + {SWARM_SIZE} swarm", world)
+
+    for size in MAP_SIZES:
+        world = GameWorld(random_level(size, rng), seed=1)
+        report(f"{size}x{size} map", world)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Sound stress test: a burst of gem pickups through SoundManager.
+
+Drives a SoundManager on its own pgzero clock under the SDL dummy audio
+driver, with the same calls main.py's play_sound makes for a pickup
+(duck the music, play gem_collect). The clock advances one 60 Hz frame at
+a time and the pickups due in each frame are sent together. At the end it
+reports the effects that actually started and how many repeats were
+coalesced, the most channels busy at once, the most callbacks waiting on
+the clock, how often the music was lowered and restored, and the cost of
+each call.
+
+--startup instead compares the two asset modes, each in a fresh process:
+everything decoded at load_all() against streamed stings with effects
+decoded on first use. It reports the time load_all() takes, resident
+memory after loading and after every effect has played once, and the
+time of the first and second play of each effect.
+
+Run from the repository root:
+
+    python benchmarks/bench_sound.py                 # 1000 pickups per second for 5 seconds
+    python benchmarks/bench_sound.py --rate 5000
+    python benchmarks/bench_sound.py --startup
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from pgzero.clock import Clock
+
+from sound_manager import SoundManager
+
+FRAME_TIME = 1 / 60
+
+
+def init_mixer():
+    # The format pgzero's runner sets up
+    pygame.mixer.pre_init(frequency=22050, size=-16, channels=2)
+    pygame.mixer.init()
+
+
+def resident_kib():
+    """Resident memory of this process in KiB (the peak where /proc isn't available)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_startup(streaming):
+    """One asset mode's load time, memory and per-effect play times, as a dict"""
+    init_mixer()
+    clock = Clock()
+    manager = SoundManager(clock, streaming=streaming, repeat_window=0)
+    before = resident_kib()
+    start = time.perf_counter()
+    manager.load_all()
+    load_ms = (time.perf_counter() - start) * 1000
+    loaded = resident_kib()
+
+    first_play = {}
+    second_play = {}
+    for name in sorted(manager.paths):
+        for plays in (first_play, second_play):
+            start = time.perf_counter()
+            manager.play(name)
+            plays[name] = round((time.perf_counter() - start) * 1000, 3)
+            manager.stop(name)
+    return {
+        "load_ms": round(load_ms, 2),
+        "loaded_kib": loaded - before,
+        "played_kib": resident_kib() - before,
+        "cached_kib": manager.cached_bytes // 1024,
+        "first_play_ms": first_play,
+        "second_play_ms": second_play,
+    }
+
+
+def compare_startup():
+    """Run each asset mode in its own process, so neither sees the other's memory"""
+    results = {}
+    for mode in ("preload", "stream"):
+        output = subprocess.run([sys.executable, __file__, "--measure", mode],
+                                capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'':<26}{'preload':>10}{'stream':>10}")
+    for key, label in (("load_ms", "load_all() ms"), ("loaded_kib", "resident KiB after load"),
+                       ("played_kib", "resident KiB after plays"), ("cached_kib", "decoded KiB cached")):
+        print(f"{label:<26}{results['preload'][key]:>10}{results['stream'][key]:>10}")
+    print("\nplay() ms, first / second call:")
+    for name in results["preload"]["first_play_ms"]:
+        preload, stream = results["preload"], results["stream"]
+        print(f"  {name:<14} preload {preload['first_play_ms'][name]:7.3f} / {preload['second_play_ms'][name]:7.3f}"
+              f"   stream {stream['first_play_ms'][name]:7.3f} / {stream['second_play_ms'][name]:7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=1000, help="pickups per second")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the burst")
+    parser.add_argument("--startup", action="store_true", help="compare load time and memory of the asset modes")
+    parser.add_argument("--measure", choices=("preload", "stream"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup:
+        compare_startup()
+        return
+    if args.measure:
+        print(json.dumps(measure_startup(args.measure == "stream")))
+        return
+
+    init_mixer()
+    clock = Clock()
+    ducking = {"lowered": 0, "restored": 0}
+    manager = SoundManager(clock,
+                           lambda: ducking.__setitem__("lowered", ducking["lowered"] + 1),
+                           lambda: ducking.__setitem__("restored", ducking["restored"] + 1))
+    start = time.perf_counter()
+    manager.load_all()
+    print(f"Loaded {len(manager.sounds)} effects in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    pickups = int(args.rate * args.seconds)
+    frames = int(args.seconds / FRAME_TIME)
+    busiest = 0
+    most_pending = 0
+    sent = 0
+    call_time = 0.0
+    for frame in range(frames):
+        clock.tick(FRAME_TIME)
+        due = pickups * (frame + 1) // frames - sent
+        start = time.perf_counter()
+        for _ in range(due):
+            manager.duck_music()
+            manager.play("gem_collect")
+        call_time += time.perf_counter() - start
+        sent += due
+
+        busiest = max(busiest, sum(channel.get_busy() for channel in manager.channels))
+        most_pending = max(most_pending, len(clock.events))
+
+    # Let the ducking timer run out
+    for _ in range(int(manager.duck_time / FRAME_TIME) + 2):
+        clock.tick(FRAME_TIME)
+
+    print(f"{sent} pickups over {args.seconds:g} s ({args.rate} per second)")
+    print(f"  effects started:      {manager.played}")
+    print(f"  repeats coalesced:    {manager.coalesced}")
+    print(f"  channels replaced:    {manager.replaced}")
+    print(f"  most channels busy:   {busiest} of {manager.channel_count}")
+    print(f"  most clock callbacks: {most_pending}")
+    print(f"  music lowered {ducking['lowered']} time(s), restored {ducking['restored']} time(s)")
+    print(f"  {call_time / sent * 1e6:.2f} us per pickup (duck_music + play)")
+
+
+if __name__ == "__main__":
+    main()
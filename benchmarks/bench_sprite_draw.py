@@ -0,0 +1,58 @@
+"""Per-entity draw cost: pgzero image names vs the prebuilt sprite tables.
+
+Run from the repository root:
+
+    python benchmarks/bench_sprite_draw.py
+"""
+import os
+import sys
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+import pgzero.loaders
+import pgzero.screen
+
+from player import Player
+from enemy import Ghost, Skeleton, Slime
+from sprite_registry import SpriteRegistry
+
+CELL_SIZE = 50
+DRAWS = 20000
+
+
+def time_draws(entities, screen):
+    """Mean microseconds per entity draw"""
+    def draw_all():
+        for entity in entities:
+            entity.draw(screen)
+    seconds = min(timeit.repeat(draw_all, number=DRAWS // len(entities), repeat=5))
+    return seconds / DRAWS * 1e6
+
+
+def main():
+    pygame.init()
+    surface = pygame.display.set_mode((800, 600))
+    screen = pgzero.screen.Screen(surface)
+    pgzero.loaders.set_root(os.path.join(ROOT, "main.py"))
+
+    sprites = SpriteRegistry()
+    sprites.load_all()
+
+    enemies = [Ghost(100, 100, CELL_SIZE), Skeleton(200, 100, CELL_SIZE), Slime(300, 100, CELL_SIZE)]
+    player = Player(400, 100, CELL_SIZE)
+
+    for name, entities in (("enemy", enemies), ("player", [player])):
+        before = time_draws(entities, screen)
+        for entity in entities:
+            entity.frames = sprites.frames(getattr(entity, "enemy_type", "player"))
+        after = time_draws(entities, screen)
+        print(f"{name:<8} by name: {before:7.2f} us   table: {after:7.2f} us   ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from pygame.rect import Rect
+
+
+class Camera:
+    """The part of the world the window shows, scrolled to follow the player.
+
+    Everything in the world is positioned in world pixels; drawing subtracts
+    the camera's offset to get screen pixels. The view is clamped to the
+    play area, so a level no bigger than the window never scrolls, and only
+    the cells and entities inside the view need drawing.
+    """
+
+    def __init__(self, width, height, cell_size):
+        self.view = Rect(0, 0, width, height)  # World pixels the window shows
+        self.cell_size = cell_size
+
+    @property
+    def offset(self):
+        """World pixel position of the window's top-left corner"""
+        return self.view.topleft
+
+    def follow(self, x, y, area_width, area_height):
+        """Centre the view on world position (x, y), without showing anything past the play area"""
+        view = self.view
+        view.x = max(0, min(int(x) - view.width // 2, area_width - view.width))
+        view.y = max(0, min(int(y) - view.height // 2, area_height - view.height))
+
+    def visible_cells(self):
+        """Cells (grid_x0, grid_y0, grid_x1, grid_y1) the view overlaps, end exclusive"""
+        view = self.view
+        cell_size = self.cell_size
+        return (view.left // cell_size, view.top // cell_size,
+                -(-view.right // cell_size), -(-view.bottom // cell_size))
+
+    def sees(self, x, y, width, height):
+        """True if a world pixel rect overlaps the view"""
+        view = self.view
+        return x < view.right and view.left < x + width and y < view.bottom and view.top < y + height
+
+    def to_screen(self, x, y):
+        return x - self.view.x, y - self.view.y
@@ -0,0 +1,240 @@
+"""Levels stored on disk as fixed-size square chunks and read through a memory map.
+
+A chunk file is a header followed by every chunk's cells (uint8, the
+level's 0/1/2 encoding) in row-major chunk order, each chunk starting on
+a page boundary. ChunkedLevel stands in for the level array in a
+GameWorld: cells are read chunk by chunk as they are needed, and at most
+max_chunks chunks are kept in memory, least recently used first out, so
+a level far bigger than memory plays with a fixed memory budget.
+
+A new file is sparse - chunks that are never written read as floor and
+take no disk space. Build one from a generated level (from the
+repository root):
+
+    python chunks.py big.chunks --dungeon cave --map-size 4096x4096
+    python main.py --world big.chunks
+"""
+import argparse
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+MAGIC = b"RGCH"
+FORMAT_VERSION = 1
+
+# magic, format version, map width, map height, chunk size, gem count
+HEADER = struct.Struct("<4sHIIHQ")
+HEADER_BYTES = 4096  # Chunks start after this, so every chunk is page aligned
+
+CHUNK_SIZE = 256  # Cells per chunk side - a multiple of 64, so a chunk is whole pages
+CHUNK_BUDGET = 64  # Chunks kept in memory (64 KiB each at the default size)
+PREFETCH_MARGIN = 32  # Cells around the player whose chunks are read ahead from disk
+
+
+def create_level_file(path, width, height, chunk_size=CHUNK_SIZE):
+    """Write an all-floor chunk file of width x height cells; chunks take disk space once written"""
+    if chunk_size % 64:
+        raise ValueError(f"chunk size must be a multiple of 64, got {chunk_size}")
+    chunks_across = -(-width // chunk_size)
+    chunks_down = -(-height // chunk_size)
+    with open(path, "wb") as level_file:
+        level_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, width, height, chunk_size, 0))
+        level_file.truncate(HEADER_BYTES + chunks_across * chunks_down * chunk_size * chunk_size)
+
+
+def save_level(path, level, chunk_size=CHUNK_SIZE):
+    """Write a whole level array to a chunk file"""
+    level = np.asarray(level, dtype=np.uint8)
+    height, width = level.shape
+    create_level_file(path, width, height, chunk_size)
+    chunk_file = ChunkFile(path, writable=True)
+    try:
+        for chunk_y in range(chunk_file.chunks_down):
+            for chunk_x in range(chunk_file.chunks_across):
+                # Cells past the level's edge are stored as wall
+                cells = np.ones((chunk_size, chunk_size), dtype=np.uint8)
+                block = level[chunk_y * chunk_size:(chunk_y + 1) * chunk_size,
+                              chunk_x * chunk_size:(chunk_x + 1) * chunk_size]
+                cells[:block.shape[0], :block.shape[1]] = block
+                chunk_file.write_chunk(chunk_x, chunk_y, cells)
+    finally:
+        chunk_file.close()
+
+
+class ChunkFile:
+    """An open chunk file - reads and writes whole chunks through a shared memory map"""
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        with open(path, "r+b" if writable else "rb") as level_file:
+            self.map = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.chunk_size, self.gem_count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} chunk file")
+        self.chunks_across = -(-self.width // self.chunk_size)
+        self.chunks_down = -(-self.height // self.chunk_size)
+        self.chunk_bytes = self.chunk_size * self.chunk_size
+
+    def offset(self, chunk_x, chunk_y):
+        return HEADER_BYTES + (chunk_y * self.chunks_across + chunk_x) * self.chunk_bytes
+
+    def read_chunk(self, chunk_x, chunk_y):
+        """A writable copy of a chunk's cells, indexed [y, x] within the chunk"""
+        offset = self.offset(chunk_x, chunk_y)
+        cells = np.frombuffer(self.map, np.uint8, self.chunk_bytes, offset).reshape(self.chunk_size, -1).copy()
+        # The copy is what's kept - unmap the file's pages so they don't count against the process
+        if hasattr(mmap, "MADV_DONTNEED"):
+            self.map.madvise(mmap.MADV_DONTNEED, offset, self.chunk_bytes)
+        return cells
+
+    def write_chunk(self, chunk_x, chunk_y, cells):
+        """Replace a chunk's cells, keeping the header's gem count up to date"""
+        offset = self.offset(chunk_x, chunk_y)
+        stored = np.frombuffer(self.map, np.uint8, self.chunk_bytes, offset).reshape(self.chunk_size, -1)
+        self.gem_count += int(np.count_nonzero(cells == 2)) - int(np.count_nonzero(stored == 2))
+        stored[:] = cells
+        HEADER.pack_into(self.map, 0, MAGIC, FORMAT_VERSION, self.width, self.height, self.chunk_size,
+                         self.gem_count)
+
+    def will_need(self, chunk_x, chunk_y):
+        """Ask the OS to start reading a chunk from disk in the background"""
+        if hasattr(mmap, "MADV_WILLNEED"):
+            self.map.madvise(mmap.MADV_WILLNEED, self.offset(chunk_x, chunk_y), self.chunk_bytes)
+
+    def close(self):
+        self.map.close()
+
+
+class ChunkedLevel:
+    """A level read from a ChunkFile a chunk at a time, in place of a [grid_y, grid_x] uint8 array.
+
+    Supports the indexing the game uses on its map - a single cell, arrays
+    of cells and rectangular slices, which return a copy - and setting
+    single cells. Changed cells are kept per chunk and applied again when an
+    evicted chunk is read back, so the file itself is never written. copy()
+    gives a fresh view of the same file without this view's changes.
+    """
+
+    def __init__(self, chunk_file, max_chunks=CHUNK_BUDGET):
+        self.file = chunk_file
+        self.max_chunks = max_chunks
+        self.shape = (chunk_file.height, chunk_file.width)
+        self.chunk_size = chunk_file.chunk_size
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> cells, least recently used first
+        self.changes = {}  # (chunk_x, chunk_y) -> {(x, y) within the chunk: value}
+        self.advised = set()  # Chunks asked to be read ahead that haven't been loaded yet
+
+        # Counters for the benchmarks
+        self.loaded = 0
+        self.evicted = 0
+
+    def copy(self):
+        return ChunkedLevel(self.file, self.max_chunks)
+
+    def chunk(self, chunk_x, chunk_y):
+        """A chunk's cells with this level's changes applied, reading it if it isn't loaded"""
+        key = (chunk_x, chunk_y)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            return cells
+
+        cells = self.file.read_chunk(chunk_x, chunk_y)
+        for (x, y), value in self.changes.get(key, {}).items():
+            cells[y, x] = value
+        self.chunks[key] = cells
+        self.advised.discard(key)
+        self.loaded += 1
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evicted += 1
+        return cells
+
+    def __getitem__(self, key):
+        grid_y, grid_x = key
+        if isinstance(grid_y, slice):
+            height, width = self.shape
+            return self.region(*grid_x.indices(width)[:2], *grid_y.indices(height)[:2])
+
+        size = self.chunk_size
+        if np.ndim(grid_y) == 0:
+            return self.chunk(grid_x // size, grid_y // size)[grid_y % size, grid_x % size]
+
+        # Look cells up one chunk at a time
+        grid_ys = np.asarray(grid_y)
+        grid_xs = np.asarray(grid_x)
+        chunk_ids = (grid_ys // size) * self.file.chunks_across + grid_xs // size
+        values = np.empty(grid_ys.shape, dtype=np.uint8)
+        for chunk_id in np.unique(chunk_ids).tolist():
+            chunk_y, chunk_x = divmod(chunk_id, self.file.chunks_across)
+            in_chunk = chunk_ids == chunk_id
+            values[in_chunk] = self.chunk(chunk_x, chunk_y)[grid_ys[in_chunk] % size, grid_xs[in_chunk] % size]
+        return values
+
+    def __setitem__(self, key, value):
+        grid_y, grid_x = key
+        size = self.chunk_size
+        chunk_key = (grid_x // size, grid_y // size)
+        x, y = grid_x % size, grid_y % size
+        self.chunk(*chunk_key)[y, x] = value
+        self.changes.setdefault(chunk_key, {})[(x, y)] = value
+
+    def region(self, x0, x1, y0, y1):
+        """Copy of the cells in columns [x0, x1) and rows [y0, y1)"""
+        size = self.chunk_size
+        cells = np.empty((max(0, y1 - y0), max(0, x1 - x0)), dtype=np.uint8)
+        for chunk_y in range(y0 // size, (y1 - 1) // size + 1 if y1 > y0 else 0):
+            top, bottom = max(y0, chunk_y * size), min(y1, (chunk_y + 1) * size)
+            for chunk_x in range(x0 // size, (x1 - 1) // size + 1 if x1 > x0 else 0):
+                left, right = max(x0, chunk_x * size), min(x1, (chunk_x + 1) * size)
+                chunk = self.chunk(chunk_x, chunk_y)
+                cells[top - y0:bottom - y0, left - x0:right - x0] = \
+                    chunk[top - chunk_y * size:bottom - chunk_y * size, left - chunk_x * size:right - chunk_x * size]
+        return cells
+
+    def prefetch(self, grid_x, grid_y, margin=PREFETCH_MARGIN):
+        """Start reading the chunks within margin cells of a cell from disk, so reaching them doesn't stall"""
+        size = self.chunk_size
+        near = set()
+        for chunk_y in range(max(0, (grid_y - margin) // size),
+                             min(self.file.chunks_down - 1, (grid_y + margin) // size) + 1):
+            for chunk_x in range(max(0, (grid_x - margin) // size),
+                                 min(self.file.chunks_across - 1, (grid_x + margin) // size) + 1):
+                key = (chunk_x, chunk_y)
+                if key not in self.chunks and key not in self.advised:
+                    self.file.will_need(chunk_x, chunk_y)
+                near.add(key)
+        # Only remember advice for chunks still nearby, so the set stays small
+        self.advised = near.difference(self.chunks)
+
+
+def open_level(path, max_chunks=CHUNK_BUDGET):
+    """A ChunkedLevel reading the chunk file at path"""
+    return ChunkedLevel(ChunkFile(path), max_chunks)
+
+
+def main():
+    from dungeon import generate, MODES, GEM_DENSITY
+
+    parser = argparse.ArgumentParser(description="Generate a level and save it as a chunk file")
+    parser.add_argument("path")
+    parser.add_argument("--dungeon", choices=MODES, default=MODES[0])
+    parser.add_argument("--map-size", default="1024x1024", metavar="WxH")
+    parser.add_argument("--gem-density", type=float, default=GEM_DENSITY)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    width, height = (int(part) for part in args.map_size.lower().split("x"))
+    level = generate(width, height, args.seed, args.dungeon, args.gem_density)
+    save_level(args.path, level, args.chunk_size)
+    print(f"Wrote a {width}x{height} {args.dungeon} level to {args.path} "
+          f"({os.path.getsize(args.path) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
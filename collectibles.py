@@ -0,0 +1,75 @@
+import numpy as np
+from pygame.rect import Rect
+
+
+class MapCollectibles:
+    """Collectibles read straight from the gem (2) cells of a map.
+
+    Nothing is indexed up front: the level's cells are the index, shared
+    by every world on a LevelOverlay of it or read a chunk at a time from
+    a chunked level, and removing a gem clears its cell through set_tile
+    (the world's, which owns every map write), so the gems a run collected
+    are just the map's changes. Pickup only reads the cells a
+    hitbox overlaps and drawing only the cells in view, so neither grows
+    with the number of gems on the level.
+    """
+
+    def __init__(self, game_map, cell_size, total, set_tile):
+        self.game_map = game_map
+        self.cell_size = cell_size
+        self.set_tile = set_tile  # set_tile(grid_x, grid_y, value) changes a map cell
+        self.remaining = total  # Gems still on the map
+        self.pending = []  # Positions collected since the renderer last drained them
+
+    def __len__(self):
+        return self.remaining
+
+    def __contains__(self, position):
+        x, y = position
+        cell_size = self.cell_size
+        map_height, map_width = self.game_map.shape
+        if x % cell_size or y % cell_size or not (0 <= x // cell_size < map_width and 0 <= y // cell_size < map_height):
+            return False
+        return self.game_map[y // cell_size, x // cell_size] == 2
+
+    def remove(self, grid_x, grid_y):
+        """Remove the collectible in a cell and return its pixel position"""
+        self.set_tile(grid_x, grid_y, 0)
+        position = (grid_x * self.cell_size, grid_y * self.cell_size)
+        self.remaining -= 1
+        self.pending.append(position)
+        return position
+
+    def drain(self):
+        """Return the positions collected since the last call and forget them"""
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def within(self, grid_x0, grid_y0, grid_x1, grid_y1):
+        """Pixel positions of the collectibles in cells [grid_x0, grid_x1) x [grid_y0, grid_y1)"""
+        map_height, map_width = self.game_map.shape
+        grid_x0, grid_y0 = max(0, grid_x0), max(0, grid_y0)
+        grid_x1, grid_y1 = min(map_width, grid_x1), min(map_height, grid_y1)
+        if grid_x1 <= grid_x0 or grid_y1 <= grid_y0:
+            return []
+        grid_ys, grid_xs = np.nonzero(self.game_map[grid_y0:grid_y1, grid_x0:grid_x1] == 2)
+        cell_size = self.cell_size
+        return list(zip(((grid_xs + grid_x0) * cell_size).tolist(), ((grid_ys + grid_y0) * cell_size).tolist()))
+
+    def pickup(self, rect):
+        """Remove the first collectible touching rect and return its cell, or None"""
+        cell_size = self.cell_size
+        game_map = self.game_map
+        map_height, map_width = game_map.shape
+        # A hitbox covers a few cells, so they are read one at a time rather than as an array
+        for grid_y in range(max(0, rect.top // cell_size), min(map_height, (rect.bottom - 1) // cell_size + 1)):
+            for grid_x in range(max(0, rect.left // cell_size), min(map_width, (rect.right - 1) // cell_size + 1)):
+                if game_map[grid_y, grid_x] != 2:
+                    continue
+                x, y = grid_x * cell_size, grid_y * cell_size
+                collectible_rect = Rect(x + 10, y + 10, cell_size - 20, cell_size - 20)
+                if rect.colliderect(collectible_rect):
+                    self.remove(grid_x, grid_y)
+                    return grid_x, grid_y
+        return None
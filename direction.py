@@ -0,0 +1,10 @@
+# Facing directions - integers so they can index sprite frame tables directly
+UP = 0
+DOWN = 1
+LEFT = 2
+RIGHT = 3
+
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+# Names used in the sprite file names, indexed by direction
+DIRECTION_NAMES = ["up", "down", "left", "right"]
@@ -0,0 +1,134 @@
+import pygame
+from pygame.rect import Rect
+from pgzero.screen import Screen
+
+from profiler import ENTITY_DRAW
+
+
+class DirtyRectRenderer:
+    """Redraws only the parts of the PLAYING screen that changed.
+
+    The map and gems are composed once into a cached background. Each frame
+    the areas the player and enemies covered last frame are restored from
+    it, the sprites are drawn at their new positions and only those rects
+    are reported in dirty_rects for the display update. The HUD is redrawn
+    only when its values change or a sprite passes over it.
+
+    An enemy swarm covers most of the screen, so while one is active every
+    frame is repainted from the cached background instead. So is every
+    frame on which the camera scrolled, after recomposing the background
+    for the new view.
+    """
+
+    def __init__(self, draw_map, draw_gems, draw_swarm, draw_hud, hud_rect, camera):
+        self.draw_map = draw_map  # draw_map(screen): floor and walls
+        self.draw_gems = draw_gems  # draw_gems(screen): remaining collectibles
+        self.draw_swarm = draw_swarm  # draw_swarm(screen, alpha): vectorized swarm enemies
+        self.draw_hud = draw_hud  # draw_hud(screen): score and gem count text
+        self.hud_rect = hud_rect  # Screen area covered by the HUD text
+        self.camera = camera  # Camera the draw functions use, moved by the caller before draw()
+        self.profiler = None  # FrameProfiler timing the entity draws, or None when not profiling
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a full redraw on the next frame (e.g. after leaving the menu)"""
+        self.floor = None
+        self.background = None
+        self.background_key = None
+        self.sprite_rects = []
+        self.hud_values = None
+        self.health = None
+        self.dirty_rects = None  # None means the whole screen changed
+
+    def build_background(self, screen, world):
+        """Compose the map, then the map plus gems, into offscreen surfaces"""
+        # The surfaces are reused, since a scrolling camera recomposes them every frame
+        if self.floor is None:
+            size = screen.surface.get_size()
+            self.floor = pygame.Surface(size)
+            self.background = pygame.Surface(size)
+        self.draw_map(Screen(self.floor))
+        self.background.blit(self.floor, (0, 0))
+        self.draw_gems(Screen(self.background))
+        self.background_key = (id(world), world.map_version, self.camera.offset)
+        # The gems were drawn from the map, so ones collected so far are already gone
+        world.collectibles.drain()
+
+    def sprite_rect(self, entity, alpha):
+        """Screen area an entity's current sprite frame covers"""
+        width, height = entity.frames[entity.direction][entity.frame].get_size()
+        x, y = entity.draw_position(alpha)
+        offset_x, offset_y = self.camera.offset
+        return Rect(int(x) - offset_x, int(y) - offset_y, width, height)
+
+    def draw(self, screen, world, alpha=1.0):
+        """Draw the frame; alpha is how far to interpolate entities toward their latest tick"""
+        surface = screen.surface
+        player = world.player
+        camera = self.camera
+        offset_x, offset_y = camera.offset
+
+        # Rebuild the cached background after a restart, when walls change or when the camera moved
+        redraw_all = (self.background is None or
+                      self.background_key != (id(world), world.map_version, camera.offset))
+        if redraw_all:
+            self.build_background(screen, world)
+        full_frame = redraw_all or len(world.swarm) > 0
+        if full_frame:
+            surface.blit(self.background, (0, 0))
+            restore = []
+        else:
+            restore = self.sprite_rects
+
+        # Remove gems collected since the last frame from the background
+        cell_size = world.cell_size
+        for x, y in world.collectibles.drain():
+            rect = Rect(x - offset_x, y - offset_y, cell_size, cell_size)
+            self.background.blit(self.floor, rect, rect)
+            restore.append(rect)
+
+        # Enemies whose sprite is outside the view are neither drawn nor erased
+        screen_rect = surface.get_rect()
+        enemies = []
+        sprite_rects = [self.sprite_rect(player, alpha)]
+        for enemy in world.enemies:
+            rect = self.sprite_rect(enemy, alpha)
+            if rect.colliderect(screen_rect):
+                enemies.append(enemy)
+                sprite_rects.append(rect)
+
+        # The HUD needs a redraw when its text changes or a sprite touched it
+        hud_values = (world.score, world.collected, world.total_collectibles)
+        redraw_hud = (full_frame or hud_values != self.hud_values or
+                      self.hud_rect.collidelist(restore) != -1 or
+                      self.hud_rect.collidelist(sprite_rects) != -1)
+        if redraw_hud:
+            restore.append(self.hud_rect)
+
+        # Erase last frame's sprites, then draw everything that moves on top
+        for rect in restore:
+            surface.blit(self.background, rect, rect)
+
+        profiler = self.profiler
+        if profiler:
+            profiler.start()
+        player.draw(screen, alpha, camera.offset)
+        for enemy in enemies:
+            enemy.draw(screen, alpha, camera.offset)
+        self.draw_swarm(screen, alpha)
+        if profiler:
+            profiler.stop(ENTITY_DRAW)
+        if redraw_hud:
+            self.draw_hud(screen)
+
+        if full_frame:
+            self.dirty_rects = None
+        else:
+            self.dirty_rects = restore + sprite_rects
+            # Hearts are drawn opaque with the player, so only push them when health changes
+            if player.health != self.health:
+                self.dirty_rects.append(player.get_health_rect())
+
+        self.sprite_rects = sprite_rects
+        self.hud_values = hud_values
+        self.health = player.health
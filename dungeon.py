@@ -0,0 +1,301 @@
+"""Seeded procedural levels in the game's cell encoding (0 = floor, 1 = wall, 2 = gem).
+
+Two layouts are available:
+
+- BSP: the map is split recursively into leaves, each leaf gets a room and
+  every split joins its two halves with an L-shaped corridor, so all rooms
+  are connected by construction.
+- Cave: random walls smoothed by a cellular automaton. Floor that can't be
+  reached from the starting cells is filled in, so the level is one
+  connected cave.
+
+Both work on whole NumPy arrays at a time: the BSP tree is split one level
+at a time and every room and corridor is drawn in one scatter of runs of
+cells, and cave connectivity is a union-find over horizontal runs of floor
+rather than cells. A 4096 x 4096 level takes 0.45-0.6 s (BSP) and
+0.65-0.9 s (cave) on one core of a shared Intel Xeon VM with Python 3.11
+and NumPy 2.4; over half the cave's time is that union-find, and a fifth
+the smoothing passes - run benchmarks/bench_dungeon.py.
+The same seed and parameters always give the same level.
+"""
+import numpy as np
+
+from world import PLAYER_START, ENEMY_STARTS
+
+BSP = "bsp"
+CAVE = "cave"
+MODES = (BSP, CAVE)
+
+GEM_DENSITY = 0.02  # Fraction of reachable floor cells that get a gem
+
+# BSP layout
+MIN_LEAF = 10  # A leaf is only split if both halves would be at least this many cells across
+MIN_ROOM = 4  # Smallest room side in cells
+
+# Cave layout
+WALL_CHANCE = 0.45  # Share of cells that start out as walls
+SMOOTHING_STEPS = 4  # Cellular automaton passes
+WALL_NEIGHBOURS = 5  # A cell becomes a wall when at least this many of its 3x3 block are walls
+
+
+def generate(width, height, seed=None, mode=BSP, gem_density=GEM_DENSITY):
+    """A width x height level as a uint8 array indexed [grid_y, grid_x]"""
+    if mode not in MODES:
+        raise ValueError(f"unknown dungeon mode {mode!r} (expected one of {', '.join(MODES)})")
+    start_x0, start_y0, start_x1, start_y1 = start_room()
+    if width < start_x1 + 1 or height < start_y1 + 1:
+        raise ValueError(f"a generated level needs at least {start_x1 + 1}x{start_y1 + 1} cells")
+
+    rng = np.random.default_rng(seed)
+    if mode == BSP:
+        floor = bsp_floor(width, height, rng)
+    else:
+        floor = cave_floor(width, height, rng)
+
+    # Gems only go on floor connected to the starting cells, never on a starting cell itself.
+    # Rather than rolling for every cell, pick as many random cells as would get a gem and keep those on floor
+    cells = rng.integers(0, width * height, rng.binomial(width * height, gem_density))
+    cells = cells[floor.ravel()[cells]]
+    level = (~floor).view(np.uint8)
+    level.ravel()[cells] = 2
+    for grid_x, grid_y in [PLAYER_START] + ENEMY_STARTS:
+        level[grid_y, grid_x] = 0
+    return level
+
+
+def start_room():
+    """(x0, y0, x1, y1) cells of the open room around the player and enemy starting cells (x1, y1 exclusive)"""
+    xs, ys = zip(*([PLAYER_START] + ENEMY_STARTS))
+    return max(1, min(xs) - 1), max(1, min(ys) - 1), max(xs) + 2, max(ys) + 2
+
+
+def fill_runs(mask, starts, lengths, step, value=True):
+    """Set lengths[i] cells of the flat mask from starts[i] on, step cells apart, to value"""
+    if not len(lengths):
+        return
+    ends = np.cumsum(lengths)
+    cells = np.arange(ends[-1], dtype=np.int64) * step
+    cells += np.repeat(starts - (ends - lengths) * step, lengths)
+    mask[cells] = value
+
+
+def fill_rects(height, width, x0, y0, x1, y1):
+    """Bool mask covering every rectangle [x0, x1) x [y0, y1)"""
+    # One-cell-wide rectangles (vertical corridor legs) are drawn as a single column run each;
+    # everything else is split into one run per row
+    mask = np.zeros(height * width, dtype=bool)
+    column = x1 - x0 == 1
+    fill_runs(mask, y0[column] * width + x0[column], y1[column] - y0[column], width)
+
+    x0, y0, x1, y1 = x0[~column], y0[~column], x1[~column], y1[~column]
+    rows = y1 - y0
+    row_ends = np.cumsum(rows)
+    rect_of_row = np.repeat(np.arange(len(rows)), rows)
+    row_ys = y0[rect_of_row] + np.arange(row_ends[-1]) - np.repeat(row_ends - rows, rows)
+    fill_runs(mask, row_ys * width + x0[rect_of_row], (x1 - x0)[rect_of_row], 1)
+    return mask.reshape(height, width)
+
+
+def bsp_floor(width, height, rng):
+    """Rooms in the leaves of a BSP tree, joined through every split, plus the start room"""
+    # Each level of the tree is an (n, 4) array of x0, y0, x1, y1 node rectangles inside the border
+    rects = np.array([[1, 1, width - 1, height - 1]], dtype=np.int64)
+    levels = []  # (rects, split mask, index of each split node's first child in the next level)
+    while len(rects):
+        sizes = rects[:, 2:] - rects[:, :2]
+        can_split = sizes >= 2 * MIN_LEAF
+        # Split across the longer side, or the one side that can be split
+        vertical = can_split[:, 0] & (~can_split[:, 1] | (sizes[:, 0] >= sizes[:, 1]))
+        split = can_split[:, 0] | can_split[:, 1]
+        first_child = np.cumsum(split) * 2 - 2
+        levels.append((rects, split, first_child))
+
+        parents = rects[split]
+        along = np.where(vertical[split], 0, 1)  # 0: split x, 1: split y
+        size = sizes[split, along]
+        offset = rng.integers(MIN_LEAF, size - MIN_LEAF + 1)
+        cut = parents[np.arange(len(parents)), along] + offset
+        first = parents.copy()
+        second = parents.copy()
+        first[np.arange(len(parents)), along + 2] = cut
+        second[np.arange(len(parents)), along] = cut
+        rects = np.stack([first, second], axis=1).reshape(-1, 4)
+
+    room_x0, room_y0, room_x1, room_y1 = [], [], [], []
+    hall_x0, hall_y0, hall_x1, hall_y1 = [], [], [], []
+
+    # Walk back up the tree: leaves get rooms, every split joins its children's representative points
+    child_points = None
+    for rects, split, first_child in reversed(levels):
+        points = np.zeros((len(rects), 2), dtype=np.int64)
+
+        leaves = rects[~split]
+        leaf_sizes = leaves[:, 2:] - leaves[:, :2]
+        room_sizes = rng.integers(MIN_ROOM, leaf_sizes - 1)  # At least one wall cell to the leaf's far side
+        room_starts = leaves[:, :2] + rng.integers(0, leaf_sizes - room_sizes)
+        room_x0.append(room_starts[:, 0])
+        room_y0.append(room_starts[:, 1])
+        room_x1.append(room_starts[:, 0] + room_sizes[:, 0])
+        room_y1.append(room_starts[:, 1] + room_sizes[:, 1])
+        points[~split] = room_starts + room_sizes // 2
+
+        if child_points is not None and split.any():
+            a = child_points[first_child[split]]
+            b = child_points[first_child[split] + 1]
+            points[split] = a
+            # Horizontal leg along a's row to b's column, then vertical leg along b's column
+            hall_x0 += [np.minimum(a[:, 0], b[:, 0]), b[:, 0]]
+            hall_x1 += [np.maximum(a[:, 0], b[:, 0]) + 1, b[:, 0] + 1]
+            hall_y0 += [a[:, 1], np.minimum(a[:, 1], b[:, 1])]
+            hall_y1 += [a[:, 1] + 1, np.maximum(a[:, 1], b[:, 1]) + 1]
+        child_points = points
+
+    # The start room, joined to the root's representative point the same way
+    start_x0, start_y0, start_x1, start_y1 = start_room()
+    root_x, root_y = child_points[0]
+    start_x, start_y = PLAYER_START
+    room_x0.append([start_x0])
+    room_y0.append([start_y0])
+    room_x1.append([start_x1])
+    room_y1.append([start_y1])
+    hall_x0 += [[min(start_x, root_x)], [root_x]]
+    hall_x1 += [[max(start_x, root_x) + 1], [root_x + 1]]
+    hall_y0 += [[start_y], [min(start_y, root_y)]]
+    hall_y1 += [[start_y + 1], [max(start_y, root_y) + 1]]
+
+    x0, y0, x1, y1 = (np.concatenate(room + hall) for room, hall in
+                      zip((room_x0, room_y0, room_x1, room_y1), (hall_x0, hall_y0, hall_x1, hall_y1)))
+    return fill_rects(height, width, x0, y0, x1, y1)
+
+
+def cave_floor(width, height, rng):
+    """Smoothed random caves, cut down to the part connected to the start room"""
+    # One random byte per cell against a threshold is much cheaper than a float per cell
+    noise = np.frombuffer(rng.bytes(width * height), dtype=np.uint8).reshape(height, width)
+    padded = np.ones((height + 2, width + 2), dtype=np.uint8)  # Cells outside the map count as walls
+    wall = padded[1:-1, 1:-1]
+    np.less(noise, round(WALL_CHANCE * 256), out=wall)
+    rows = np.empty((height, width + 2), dtype=np.uint8)
+    counts = np.empty((height, width), dtype=np.uint8)
+    for _ in range(SMOOTHING_STEPS):
+        # 3x3 wall counts as two separable box sums, into buffers reused across passes
+        np.add(padded[:-2], padded[1:-1], out=rows)
+        rows += padded[2:]
+        np.add(rows[:, :-2], rows[:, 1:-1], out=counts)
+        counts += rows[:, 2:]
+        np.greater_equal(counts, WALL_NEIGHBOURS, out=wall)
+
+    floor = wall == 0
+    floor[[0, -1], :] = False
+    floor[:, [0, -1]] = False
+    start_x0, start_y0, start_x1, start_y1 = start_room()
+    floor[start_y0:start_y1, start_x0:start_x1] = True
+
+    # Join the start room to the biggest cave with a corridor; everything left unconnected is filled in
+    run_starts, run_lengths, roots = floor_regions(floor)
+    start_x, start_y = PLAYER_START
+    start_root = roots[run_at(run_starts, start_y * width + start_x)]
+    biggest = np.argmax(np.bincount(roots, weights=run_lengths))
+    kept = [start_root, biggest]
+    if biggest != start_root:
+        biggest_x, biggest_y = nearest_cell(floor, run_starts, roots == biggest, start_x, start_y)
+        corridor = np.zeros_like(floor)
+        corridor[start_y, min(start_x, biggest_x):max(start_x, biggest_x) + 1] = True
+        corridor[min(start_y, biggest_y):max(start_y, biggest_y) + 1, biggest_x] = True
+        # Any other region the corridor runs through or alongside is joined too
+        ys, xs = np.nonzero(corridor)
+        ys = np.concatenate([ys, ys - 1, ys + 1, ys, ys])
+        xs = np.concatenate([xs, xs, xs, xs - 1, xs + 1])
+        touched = floor[ys, xs]
+        kept += list(roots[run_at(run_starts, ys[touched] * width + xs[touched])])
+        floor |= corridor
+
+    # Unconnected floor is a small share of the map, so clear just those runs
+    dropped = ~np.isin(roots, kept)
+    fill_runs(floor.ravel(), run_starts[dropped], run_lengths[dropped], 1, False)
+    return floor
+
+
+def run_at(run_starts, cells):
+    """Index of the run holding each floor cell (flat indices)"""
+    return np.searchsorted(run_starts, cells, side="right") - 1
+
+
+def nearest_cell(floor, run_starts, run_mask, grid_x, grid_y):
+    """(x, y) of the floor cell in a run picked by run_mask closest to (grid_x, grid_y) by Manhattan distance"""
+    height, width = floor.shape
+    radius = 16
+    while True:
+        # Look in a growing window; the nearest cell in it is only certain once it's within radius
+        x0, y0 = max(0, grid_x - radius), max(0, grid_y - radius)
+        x1, y1 = min(width, grid_x + radius + 1), min(height, grid_y + radius + 1)
+        ys, xs = np.nonzero(floor[y0:y1, x0:x1])
+        ys += y0
+        xs += x0
+        picked = run_mask[run_at(run_starts, ys * width + xs)]
+        ys, xs = ys[picked], xs[picked]
+        distances = np.abs(xs - grid_x) + np.abs(ys - grid_y)
+        whole_map = x0 == 0 and y0 == 0 and x1 == width and y1 == height
+        if len(distances) and (distances.min() <= radius or whole_map):
+            nearest = np.argmin(distances)
+            return int(xs[nearest]), int(ys[nearest])
+        radius *= 4
+
+
+def floor_regions(floor):
+    """4-connected regions of floor, found over horizontal runs of floor cells rather than cells.
+
+    Returns the flat index of the first cell of every run, the length of
+    every run and the root run of every run's region. Runs on neighbouring
+    rows that overlap are linked, and link_roots() joins them. The map
+    border must be wall.
+    """
+    width = floor.shape[1]
+    # With wall all round, changes between wall and floor alternate: a run's first cell, then the cell after its last
+    flat = floor.ravel()
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    run_starts = changes[0::2]
+    run_lengths = changes[1::2] - run_starts
+
+    # One link per stretch where a run touches the run below it. A stretch starts at the first cell of
+    # one of the two runs, so only the run on the other side has to be looked up
+    above = run_starts - width
+    upper_first = np.flatnonzero(flat[run_starts + width])  # Runs with floor under their first cell
+    lower_first = np.flatnonzero(flat[above] & flat[above - 1])  # Runs starting under the middle of a run
+    a = np.concatenate([upper_first, run_at(run_starts, above[lower_first])])
+    b = np.concatenate([run_at(run_starts, run_starts[upper_first] + width), lower_first])
+
+    return run_starts, run_lengths, link_roots(len(run_starts), a, b)
+
+
+def link_roots(count, a, b):
+    """The root of every one of count nodes, joined by links a[i] - b[i]; a root is its component's smallest node.
+
+    One vectorized union-find round hooks every link's larger node onto
+    its smaller one (where several links hook the same node one of them
+    wins) and jumps pointers until every node points straight at its
+    root. The links still spanning two roots are then solved the same way
+    on just those roots, numbered compactly, so later rounds cost next to
+    nothing instead of a pass over every node each.
+    """
+    roots = np.arange(count)  # intp, so indexing with it needs no conversion
+    roots[np.maximum(a, b)] = np.minimum(a, b)
+    while True:
+        jumped = roots[roots]
+        if np.array_equal(jumped, roots):
+            break
+        roots = jumped
+
+    roots_a = roots[a]
+    roots_b = roots[b]
+    differ = np.flatnonzero(roots_a != roots_b)
+    if len(differ):
+        roots_a = roots_a[differ]
+        roots_b = roots_b[differ]
+        # Compact numbering keeps the roots' order, so each component's root is still its smallest node
+        nodes = np.unique(np.concatenate([roots_a, roots_b]))
+        node_roots = link_roots(len(nodes), np.searchsorted(nodes, roots_a), np.searchsorted(nodes, roots_b))
+        moved = np.arange(count)
+        moved[nodes] = nodes[node_roots]
+        roots = moved[roots]
+    return roots
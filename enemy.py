@@ -2,14 +2,18 @@ import random
 import math
 from pygame.rect import Rect
 
+from direction import UP, DOWN, LEFT, RIGHT, DIRECTIONS, DIRECTION_NAMES
+
 class Enemy:
-    def __init__(self, x, y, cell_size, enemy_type="ghost"):
+    def __init__(self, x, y, cell_size, enemy_type="ghost", rng=None):
         # Position variables
         self.x = x
         self.y = y
         self.target_x = x
         self.target_y = y
         self.move_speed = 2  # Slower than player
+        self.previous_x = x  # Position at the start of the last tick, for interpolated drawing
+        self.previous_y = y
         self.cell_size = cell_size
         self.enemy_type = enemy_type
         
@@ -19,17 +23,23 @@ class Enemy:
         self.min_y = 0
         self.max_y = 600
         
+        # Random source for wandering - the world passes a seeded one so runs can be replayed
+        self.rng = rng if rng is not None else random
+        
         # Direction and movement
-        self.directions = ["up", "down", "left", "right"]
-        self.direction = random.choice(self.directions)
+        self.directions = DIRECTIONS
+        self.direction = self.rng.choice(self.directions)
         self.is_moving = False
         self.movement_cooldown = 0
+        self.chases_player = False  # Follow the world's flow field toward the player
+        self.navigator = None  # The GameWorld, set with set_navigator()
         
         # Animation variables
         self.frame = 0
         self.animation_speed = 0.1
         self.animation_timer = 0
         self.frames_per_direction = 4
+        self.frames = None  # Sprite table [direction][frame] from the SpriteRegistry
     
     def set_boundaries(self, min_x, max_x, min_y, max_y):
         self.min_x = min_x
@@ -37,16 +47,21 @@ class Enemy:
         self.min_y = min_y
         self.max_y = max_y
     
-    def update(self):
+    def update(self, dt=1.0):
+        # Advance one tick - dt is the tick length in 60 Hz frames, the unit speeds and timers are tuned in
+        self.previous_x = self.x
+        self.previous_y = self.y
+        step = self.move_speed * dt
+        
         # Update animation timer
-        self.animation_timer += 1
+        self.animation_timer += dt
         
         # If we reach the target position, stop moving and set cooldown
-        if self.is_moving and abs(self.x - self.target_x) < self.move_speed and abs(self.y - self.target_y) < self.move_speed:
+        if self.is_moving and abs(self.x - self.target_x) < step and abs(self.y - self.target_y) < step:
             self.x = self.target_x
             self.y = self.target_y
             self.is_moving = False
-            self.movement_cooldown = random.randint(30, 90)  # Wait 0.5-1.5 seconds
+            self.movement_cooldown = self.rng.randint(30, 90)  # Wait 0.5-1.5 seconds
         
         # If still moving, update position
         if self.is_moving:
@@ -57,8 +72,8 @@ class Enemy:
             # Normalize direction vector
             distance = math.sqrt(dx * dx + dy * dy)
             if distance > 0:
-                dx = dx / distance * self.move_speed
-                dy = dy / distance * self.move_speed
+                dx = dx / distance * step
+                dy = dy / distance * step
             
             # Update position
             self.x += dx
@@ -66,7 +81,7 @@ class Enemy:
         else:
             # Decrement cooldown timer
             if self.movement_cooldown > 0:
-                self.movement_cooldown -= 1
+                self.movement_cooldown -= dt
             else:
                 # Choose a random direction and move
                 self.change_direction()
@@ -76,32 +91,61 @@ class Enemy:
             self.frame = (self.frame + 1) % self.frames_per_direction
             self.animation_timer = 0
     
-    def draw(self, screen):
+    def draw_position(self, alpha=1.0):
+        # Position between the last two ticks - alpha 0 is the previous tick, 1 the current one
+        return (self.previous_x + (self.x - self.previous_x) * alpha,
+                self.previous_y + (self.y - self.previous_y) * alpha)
+    
+    def draw(self, screen, alpha=1.0, offset=(0, 0)):
         # Determine which sprite to use based on type, direction, and frame
-        # Account for nested directory structure
-        sprite_name = f"enemies/{self.enemy_type}/{self.enemy_type}_{self.direction}_{self.frame}"
+        if self.frames is not None:
+            sprite = self.frames[self.direction][self.frame]
+        else:
+            # Account for nested directory structure
+            direction_name = DIRECTION_NAMES[self.direction]
+            sprite = f"enemies/{self.enemy_type}/{self.enemy_type}_{direction_name}_{self.frame}"
         
         # Draw the sprite at the current position
-        screen.blit(sprite_name, (self.x, self.y))
+        x, y = self.draw_position(alpha)
+        screen.blit(sprite, (x - offset[0], y - offset[1]))
+    
+    def set_navigator(self, navigator):
+        """Let the enemy ask the world which moves are valid and (for chasers) where the player is"""
+        self.navigator = navigator
     
     def change_direction(self):
-        self.direction = random.choice(self.directions)
+        # Each direction's target - only the axis being moved along changes
+        candidates = {}
+        if self.y - self.cell_size >= self.min_y:
+            candidates[UP] = (self.target_x, self.y - self.cell_size)
+        if self.y + self.cell_size <= self.max_y:
+            candidates[DOWN] = (self.target_x, self.y + self.cell_size)
+        if self.x - self.cell_size >= self.min_x:
+            candidates[LEFT] = (self.x - self.cell_size, self.target_y)
+        if self.x + self.cell_size <= self.max_x:
+            candidates[RIGHT] = (self.x + self.cell_size, self.target_y)
         
-        if self.direction == "up" and self.y - self.cell_size >= self.min_y:
-            self.target_y = self.y - self.cell_size
-            self.is_moving = True
-        elif self.direction == "down" and self.y + self.cell_size <= self.max_y:
-            self.target_y = self.y + self.cell_size
-            self.is_moving = True
-        elif self.direction == "left" and self.x - self.cell_size >= self.min_x:
-            self.target_x = self.x - self.cell_size
-            self.is_moving = True
-        elif self.direction == "right" and self.x + self.cell_size <= self.max_x:
-            self.target_x = self.x + self.cell_size
-            self.is_moving = True
-        else:
-            # If movement would be out of bounds, try another direction
-            self.change_direction()
+        # Skip moves into walls when we know about the map (one batched check)
+        if self.navigator is not None and candidates:
+            targets = list(candidates.values())
+            valid = self.navigator.valid_moves([x for x, _ in targets], [y for _, y in targets]).tolist()
+            candidates = {direction: target for (direction, target), ok in zip(candidates.items(), valid) if ok}
+        
+        if not candidates:
+            # Boxed in - stay put and try again next time
+            self.is_moving = False
+            return
+        
+        # Chasers follow the flow field toward the player, everyone else wanders
+        direction = None
+        if self.chases_player and self.navigator is not None:
+            direction = self.navigator.chase_direction(self.x, self.y)
+        if direction not in candidates:
+            direction = self.rng.choice(list(candidates))
+        
+        self.direction = direction
+        self.target_x, self.target_y = candidates[direction]
+        self.is_moving = True
     
     def get_rect(self):
         # Return a rectangle representing the enemy's hitbox
@@ -113,21 +157,22 @@ class Enemy:
 
 
 class Ghost(Enemy):
-    def __init__(self, x, y, cell_size):
-        super().__init__(x, y, cell_size, "ghost")
+    def __init__(self, x, y, cell_size, rng=None):
+        super().__init__(x, y, cell_size, "ghost", rng)
         self.move_speed = 1.5  # Ghosts move slower
         self.animation_speed = 0.12
 
 
 class Skeleton(Enemy):
-    def __init__(self, x, y, cell_size):
-        super().__init__(x, y, cell_size, "skeleton")
+    def __init__(self, x, y, cell_size, rng=None):
+        super().__init__(x, y, cell_size, "skeleton", rng)
         self.move_speed = 2.0  # Average speed
         self.animation_speed = 0.1
+        self.chases_player = True  # Skeletons hunt the player
 
 
 class Slime(Enemy):
-    def __init__(self, x, y, cell_size):
-        super().__init__(x, y, cell_size, "slime")
+    def __init__(self, x, y, cell_size, rng=None):
+        super().__init__(x, y, cell_size, "slime", rng)
         self.move_speed = 1.0  # Slimes are the slowest
         self.animation_speed = 0.08
\ No newline at end of file
@@ -0,0 +1,107 @@
+import sys
+
+import pygame
+import pgzero.clock
+from pgzero.game import PGZeroGame
+
+# Longest dt update() is given for the frame that ends an idle sleep
+IDLE_FRAME_TIME = 1 / 60
+
+
+class GameLoop(PGZeroGame):
+    """Pygame Zero's main loop with a hook for presenting the frame.
+
+    If the game module defines present(), it is called after draw() instead
+    of pygame.display.flip(), so the game can push only the regions of the
+    screen that changed. RENDER_RATE in the game module caps the frames
+    drawn per second (0 for no cap, default 60).
+
+    If the game module defines is_idle() and it returns True, nothing on
+    screen is moving: the loop sleeps until an input event arrives or the
+    next clock callback is due, and only redraws if one of those happened.
+    The update() after a sleep gets at most one frame's dt, so the time
+    asleep isn't caught up (e.g. by a fixed timestep) once play resumes.
+    """
+
+    def get_present_func(self):
+        return getattr(self.mod, "present", pygame.display.flip)
+
+    def get_idle_func(self):
+        return getattr(self.mod, "is_idle", lambda: False)
+
+    def wait_for_event(self, pgzclock):
+        """Block until an event arrives or the next scheduled callback is due; NOEVENT on timeout"""
+        if pgzclock._each_tick:
+            # Something runs every tick (e.g. an animation), so there's no sleeping
+            return pygame.event.Event(pygame.NOEVENT)
+        if pgzclock.events:
+            remaining = int((pgzclock.events[0].time - pgzclock.t) * 1000)
+            if remaining <= 0:
+                return pygame.event.Event(pygame.NOEVENT)
+            return pygame.event.wait(remaining)
+        return pygame.event.wait()
+
+    def mainloop(self):
+        """Run the main loop - same as pgzero's, apart from present(), RENDER_RATE and is_idle()"""
+        clock = pygame.time.Clock()
+        self.reinit_screen()
+
+        update = self.get_update_func()
+        draw = self.get_draw_func()
+        present = self.get_present_func()
+        is_idle = self.get_idle_func()
+        render_rate = getattr(self.mod, "RENDER_RATE", 60)
+        self.load_handlers()
+
+        pgzclock = pgzero.clock.clock
+
+        self.need_redraw = True
+        while True:
+            idle = is_idle() and not self.need_redraw
+            events = []
+            if idle:
+                event = self.wait_for_event(pgzclock)
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+
+            dt = clock.tick(render_rate) / 1000.0
+
+            events.extend(pygame.event.get())
+            for event in events:
+                if event.type == pygame.QUIT:
+                    return
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_q and \
+                            event.mod & (pygame.KMOD_CTRL | pygame.KMOD_META):
+                        sys.exit(0)
+                    self.keyboard._press(event.key)
+                elif event.type == pygame.KEYUP:
+                    self.keyboard._release(event.key)
+                self.dispatch_event(event)
+
+            pgzclock.tick(dt)
+            if idle:
+                # Callbacks above need the real time asleep, but the game only moves on by a frame
+                dt = min(dt, IDLE_FRAME_TIME)
+
+            if update:
+                update(dt)
+
+            screen_change = self.reinit_screen()
+            if idle:
+                # A static screen only changes in response to input or a callback
+                redraw = screen_change or events or pgzclock.fired
+            else:
+                redraw = screen_change or update or pgzclock.fired or self.need_redraw
+            if redraw:
+                draw()
+                present()
+                self.need_redraw = False
+
+
+def go():
+    """Run the __main__ module with GameLoop - a drop-in for pgzrun.go()"""
+    # Under the 'pgzrun' command the runner owns the loop already
+    if getattr(sys, "_pgzrun", None):
+        return
+    GameLoop(sys.modules["__main__"]).run()
@@ -1,29 +1,96 @@
-import pgzrun
-import math
+import argparse
+import atexit
+import io
+import os
 import random
+
+import pgzrun
+import pygame
+from pgzero import ptext
 from pygame.rect import Rect
 
-from player import Player
-from enemy import Enemy, Ghost, Skeleton, Slime
+import game_loop
+from atlas import TextureAtlas, ATLAS_IMAGE, find_images
+from camera import Camera
+from dirty_renderer import DirtyRectRenderer
+from chunks import open_level
+from dungeon import generate, MODES, GEM_DENSITY
+from direction import UP, DOWN, LEFT, RIGHT
+from map_tiles import MapTiles
 from menu import Menu
+from overlay import base_level
+from preloader import AssetPreloader
+from profiler import FrameProfiler, MAP_DRAW, GEM_DRAW, ENTITY_DRAW, UI_DRAW
+from replay import ReplayRecorder
+from snapshot import write_snapshot, read_snapshot
+from sound_manager import SoundManager
+from sprite_registry import SpriteRegistry, load_image
+from text_cache import TextCache, TOP_CENTER, TOP_RIGHT
+from swarm import ENEMY_TYPES, frame_sizes
+from timestep import FixedTimestep
+from transform_cache import TransformCache
+from world import GameWorld, ORIGINAL_LEVEL, WIDTH, HEIGHT, CELL_SIZE, BASE_TICK_RATE, MENU, PLAYING, GAME_OVER, WIN
 
 # Constants
-WIDTH = 800
-HEIGHT = 600
 TITLE = "Roguelike Adventure"
 
-# Cell size for grid-based movement
-CELL_SIZE = 50
-
-# Game states
-MENU = 0
-PLAYING = 1
-GAME_OVER = 2
-WIN = 3
+def map_size(text):
+    """Parse a WxH level size in cells"""
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT in cells, got {text!r}")
+    return width, height
+
+# Command line options, chosen at startup
+parser = argparse.ArgumentParser(description=TITLE)
+parser.add_argument("--dirty-rects", action="store_true",
+                    help="while playing, redraw and update only the screen regions that changed")
+parser.add_argument("--swarm", type=int, default=0, metavar="N",
+                    help="add N extra enemies driven by the vectorized enemy swarm")
+parser.add_argument("--logic-rate", type=int, default=BASE_TICK_RATE, metavar="HZ",
+                    help="game logic ticks per second (default %(default)s)")
+parser.add_argument("--render-rate", type=int, default=60, metavar="FPS",
+                    help="maximum frames drawn per second, 0 for no limit (default %(default)s)")
+parser.add_argument("--record", metavar="FILE",
+                    help="record each run's seed and inputs to FILE (check it with 'python replay.py FILE')")
+parser.add_argument("--profile", metavar="FILE",
+                    help="start with the frame profiler on (F3 toggles it) and export its timings "
+                         "to FILE on exit - CSV, or JSON if FILE ends in .json")
+parser.add_argument("--stream-audio", action="store_true",
+                    help="stream the win and game over stings from disk and decode other sound "
+                         "effects on first use, keeping at most 1 MiB of them in memory")
+parser.add_argument("--dungeon", choices=MODES,
+                    help="play a procedurally generated level - bsp rooms and corridors, or cave")
+parser.add_argument("--map-size", type=map_size, default=(WIDTH // CELL_SIZE, HEIGHT // CELL_SIZE), metavar="WxH",
+                    help="size in cells of a generated level (default: the window, 16x12)")
+parser.add_argument("--gem-density", type=float, default=GEM_DENSITY, metavar="FRACTION",
+                    help="share of a generated level's floor cells holding a gem (default %(default)s)")
+parser.add_argument("--map-seed", type=int, metavar="SEED",
+                    help="seed for the generated level (default: random)")
+parser.add_argument("--world", metavar="FILE",
+                    help="play a level from a chunk file (make one with 'python chunks.py'), "
+                         "reading it from disk a chunk at a time")
+options, _ = parser.parse_known_args()
+
+# Quick save file, written with F5 and loaded with F9 while playing
+SAVE_FILE = "quicksave.sav"
+
+# Where the frame profiler's timings go on exit when --profile doesn't name a file
+PROFILE_FILE = "frame_profile.csv"
+
+# Frames per second the game loop draws at - logic runs at its own fixed rate
+RENDER_RATE = options.render_rate
+
+# The window's view of the world, following the player across levels bigger than the window
+camera = Camera(WIDTH, HEIGHT, CELL_SIZE)
+
+# Startup screen shown while the asset preloader runs - only main.py uses it, the world never does
+LOADING = -1
 
 # Initialize game state
-game_state = MENU
-previous_game_state = MENU  # Track previous state for sound changes
+game_state = LOADING
+previous_game_state = LOADING  # Track previous state for sound changes
 music_on = True
 sound_on = True
 
@@ -34,127 +101,83 @@ game_over_sound_playing = False
 # Volume settings
 NORMAL_MUSIC_VOLUME = 1.0  # Normal background music volume
 LOWERED_MUSIC_VOLUME = 0.3  # Music volume when playing sound effects
+DUCKING_SOUNDS = ("gem_collect", "hurt")  # Effects that lower the music while playing
+
+sound_manager = None  # SoundManager holding every effect, loaded at startup
 
 # Flag to track if we're using custom gem sprites
 use_custom_gems = True
-gem_actors = []  # Store gem actors
-
-# Original map - used as a template to reset the game
-# 0 = empty space, 1 = wall, 2 = collectible
-ORIGINAL_MAP = [
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 0, 0, 1],
-    [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-    [1, 0, 0, 1, 0, 2, 0, 0, 0, 0, 2, 0, 1, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 1, 0, 2, 0, 0, 0, 0, 2, 0, 1, 0, 0, 1],
-    [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-    [1, 0, 0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
-]
-
-# Current map - this will change during gameplay
-game_map = []
-
-# Calculate map dimensions 
-MAP_WIDTH = len(ORIGINAL_MAP[0])
-MAP_HEIGHT = len(ORIGINAL_MAP)
-
-# Collectibles
-collectibles = []
-total_collectibles = 0
-collected = 0
-
-# Score
-score = 0
+
+# Size of the gem sprite relative to gem.png (20x20, half a cell)
+GEM_SCALE = 1.0
+
+# Scaled and rotated images, computed once and shared by everything drawn with them
+transform_cache = TransformCache(images.load)
+
+# Cached floor and wall tiles, rendered as they come into view and dropped when the world's map_version changes
+WALL_COLOR = (100, 100, 100)
+map_tiles = MapTiles(CELL_SIZE, WALL_COLOR)
+
+# Rendered text for the HUD, menu and end screens - strings are only rasterized when they change
+text_cache = TextCache()
+
+# Screen area covered by the score and gem count text
+HUD_RECT = Rect(WIDTH - 220, 10, 210, 75)
+dirty_renderer = None  # DirtyRectRenderer when started with --dirty-rects
+
+# Fixed logic ticks, decoupled from the frame rate
+timestep = FixedTimestep(options.logic_rate)
+render_alpha = 1.0  # How far draws interpolate from the previous tick to the latest one
+recorder = None  # ReplayRecorder for the current run when started with --record
+
+# Per-phase frame timings, toggled with F3 - the overlay shows averages over the last second
+profiler = FrameProfiler()
+profiler.enabled = bool(options.profile)
+PROFILER_RECT = Rect(10, HEIGHT - 185, 250, 175)
+
+# Every image and sound, decoded on background threads at startup
+preloader = None
+ATLAS_ASSET = "atlas"  # Preloaded image name of the texture atlas, when it's built
+FONT_SIZES = (20, 24, 30, 40, 60)  # Font sizes the game draws text in, opened during loading
+DEFAULT_FONT = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+LOADING_BAR = Rect(WIDTH // 2 - 150, HEIGHT // 2 + 20, 300, 20)
+
+# The level every run starts from - the fixed map, or one generated at startup with --dungeon
+level = ORIGINAL_LEVEL
+level_params = None  # (mode, map seed, gem density) of a generated level, kept in replays to rebuild it
+play_area = (WIDTH, HEIGHT)  # Pixels the player can move in - the window for the fixed map, else the whole level
 
 # Initialize game objects
-player = None
-enemies = []
+world = None
 menu = None
-
-def reset_map():
-    """Reset the game map to its original state"""
-    global game_map
-    game_map = []
-    for row in ORIGINAL_MAP:
-        game_map.append(row.copy())
+sprites = None  # SpriteRegistry with every player/enemy frame, loaded at startup
+swarm_frames = []  # Frame tables for the swarm, indexed by enemy type
+swarm_sizes = None  # Their largest frame sizes, for culling the swarm
 
 def initialize_game():
-    global player, enemies, menu, collectibles, total_collectibles, collected, score, game_over_sound_playing, win_sound_playing, gem_actors, use_custom_gems
-    
-    # Reset map to original state
-    reset_map()
+    global world, menu, game_over_sound_playing, win_sound_playing, use_custom_gems, recorder
     
-    # Reset collectibles and score
-    collectibles = []
-    gem_actors = []
-    total_collectibles = 0
-    collected = 0
-    score = 0
+    # Reset map, player, enemies, collectibles and score
+    world = GameWorld(level, width=play_area[0], height=play_area[1], tick_rate=options.logic_rate)
+    if options.swarm:
+        world.spawn_swarm(options.swarm)
+    map_tiles.clear()
+    attach_sprites()
+    world.profiler = profiler if profiler.enabled else None
+    if options.record:
+        recorder = ReplayRecorder(world, options.swarm, level_params)
     
     # Reset sound state
     game_over_sound_playing = False
     win_sound_playing = False
     
     # Create menu
-    menu = Menu(WIDTH, HEIGHT)
-    
-    # Create player at starting position
-    player = Player(2 * CELL_SIZE, 2 * CELL_SIZE, CELL_SIZE)
-    
-    # Create enemies
-    enemies = [
-        Ghost(5 * CELL_SIZE, 5 * CELL_SIZE, CELL_SIZE),
-        Skeleton(10 * CELL_SIZE, 3 * CELL_SIZE, CELL_SIZE),
-        Slime(8 * CELL_SIZE, 8 * CELL_SIZE, CELL_SIZE)
-    ]
-    
-    # Set movement boundaries for enemies
-    for enemy in enemies:
-        # Only allow enemies to move within the playable area
-        enemy.set_boundaries(1 * CELL_SIZE, (len(game_map[0])-2) * CELL_SIZE, 
-                             1 * CELL_SIZE, (len(game_map)-2) * CELL_SIZE)
-    
-    # Find and initialize collectibles
-    for y, row in enumerate(game_map):
-        for x, cell in enumerate(row):
-            if cell == 2:  # Collectible
-                coll_x = x * CELL_SIZE
-                coll_y = y * CELL_SIZE
-                collectibles.append((coll_x, coll_y))
-                
-                # Create gem actors if we're using custom gems
-                if use_custom_gems:
-                    try:
-                        # Create an Actor for each gem
-                        # This will use gem.png from the images folder
-                        new_gem = Actor('gem')
-                        
-                        # Set position
-                        new_gem.pos = (coll_x + CELL_SIZE // 2, coll_y + CELL_SIZE // 2)
-                        
-                        # Scale the image to be smaller
-                        # These values control the displayed size of the gem
-                        # Adjust these to make the gems smaller or larger
-                        new_gem.scale = 0.3  # Reduce size to 30% of original
-                        
-                        gem_actors.append(new_gem)
-                    except:
-                        # If there's an error, add None to keep the indexes aligned
-                        gem_actors.append(None)
-                        
-                total_collectibles += 1
+    menu = Menu(WIDTH, HEIGHT, text_cache)
     
     # Check if we should use custom gems
     try:
-        # Try creating a test actor to see if the gem image is available
-        test_gem = Actor('gem')
+        # Fetching the gem sprite also puts it in the transform cache for the first draw
+        transform_cache.get('gem', GEM_SCALE)
         use_custom_gems = True
         print("Successfully loaded gem image")
     except Exception as e:
@@ -164,6 +187,161 @@ def initialize_game():
     # Play background music if enabled and in the right game state
     play_background_music()
 
+def generate_level():
+    """Build the --dungeon level once; every restart replays the same map"""
+    global level, level_params, play_area
+    seed = options.map_seed if options.map_seed is not None else random.randrange(2 ** 32)
+    width, height = options.map_size
+    try:
+        # Made read-only once, so every restart's world shares it and its gem count
+        level = base_level(generate(width, height, seed, options.dungeon, options.gem_density))
+    except ValueError as e:
+        print(f"Error generating level: {e}")
+        return
+    level_params = (options.dungeon, seed, options.gem_density)
+    play_area = (width * CELL_SIZE, height * CELL_SIZE)
+    print(f"Generated a {width}x{height} {options.dungeon} level (map seed {seed})")
+
+def open_world_file():
+    """Play the --world chunk file; every restart reads the same file"""
+    global level, play_area
+    try:
+        level = open_level(options.world)
+    except Exception as e:
+        print(f"Error opening world {options.world}: {e}")
+        return
+    height, width = level.shape
+    play_area = (width * CELL_SIZE, height * CELL_SIZE)
+    print(f"Opened a {width}x{height} chunked world from {options.world}")
+    if options.record:
+        # A replay rebuilds its level from a seed, which a chunk file doesn't have
+        print("Replays can't be recorded in a chunked world, not recording")
+        options.record = None
+
+def save_game():
+    """Write a snapshot of the running game to SAVE_FILE"""
+    try:
+        write_snapshot(world, SAVE_FILE)
+        print(f"Game saved to {SAVE_FILE}")
+    except Exception as e:
+        print(f"Error saving game: {e}")
+
+def load_game():
+    """Replace the running game with the snapshot in SAVE_FILE"""
+    global world, recorder
+    try:
+        loaded = read_snapshot(SAVE_FILE)
+    except Exception as e:
+        print(f"Error loading game: {e}")
+        return
+    
+    # A loaded game can't be replayed from a seed, so the current recording ends here
+    save_recording()
+    recorder = None
+    
+    world = loaded
+    map_tiles.clear()
+    attach_sprites()
+    world.profiler = profiler if profiler.enabled else None
+    timestep.reset()
+    print(f"Game loaded from {SAVE_FILE}")
+
+def start_loading():
+    """Start decoding every image and sound on the preloader's threads - the loading screen shows progress"""
+    global preloader, sound_manager
+    sound_manager = SoundManager(clock.clock, lower_music_volume, restore_music_volume,
+                                 streaming=options.stream_audio)
+    
+    # With the texture atlas built, every image is a view of the one atlas image
+    if TextureAtlas.is_built():
+        image_files = {ATLAS_ASSET: ATLAS_IMAGE}
+    else:
+        print("No texture atlas found, loading individual images (run 'python atlas.py' to build it)")
+        image_files = find_images()
+    sound_files = sound_manager.find_sounds() if pygame.mixer.get_init() else {}
+    
+    preloader = AssetPreloader(image_files, sound_files, {"default": DEFAULT_FONT})
+    preloader.start()
+
+def finish_loading():
+    """Set up the game from the preloaded assets once every file is decoded"""
+    global game_state, previous_game_state, dirty_renderer
+    load_sprites(preloader.images)
+    sound_manager.load_all(preloader.sounds)
+    load_fonts(preloader.fonts)
+    print(f"Preloaded {len(preloader)} assets in {preloader.elapsed * 1000:.0f} ms")
+    
+    if options.world:
+        open_world_file()
+    elif options.dungeon:
+        generate_level()
+    initialize_game()
+    if options.dirty_rects:
+        dirty_renderer = DirtyRectRenderer(draw_map, draw_gems, draw_swarm, draw_ui, HUD_RECT, camera)
+        dirty_renderer.profiler = world.profiler
+    game_state = previous_game_state = MENU
+
+def load_sprites(preloaded):
+    """Build every player and enemy animation frame table from the preloaded images"""
+    global sprites, swarm_frames, swarm_sizes
+    if ATLAS_ASSET in preloaded:
+        atlas = TextureAtlas.load(surface=preloaded[ATLAS_ASSET])
+        # Name lookups such as images.load('gem') also get views of the atlas
+        atlas.preload_into(images)
+        sprites = SpriteRegistry(atlas.get)
+    else:
+        for name, surface in preloaded.items():
+            images.cache[images.cache_key(name, (), {})] = surface
+        # Anything that failed to preload is read from disk as before
+        sprites = SpriteRegistry(lambda name: preloaded[name] if name in preloaded else load_image(name))
+    sprites.load_all()
+    swarm_frames = [sprites.frames(enemy_type) for enemy_type in ENEMY_TYPES]
+    swarm_sizes = frame_sizes(swarm_frames)
+
+def load_fonts(preloaded):
+    """Open the default font at every size the game uses, reading glyphs from memory rather than the font file"""
+    font_data = preloaded.get("default")
+    if font_data is None:
+        return
+    for fontsize in FONT_SIZES:
+        # Stored under the key ptext.getfont looks the default font up by, so screen.draw.text finds it too
+        key = (ptext.DEFAULT_FONT_NAME, fontsize, None, None, None, None)
+        # pygame shrinks sizes asked of its default font by this factor - do the same so text looks identical
+        ptext._font_cache[key] = pygame.font.Font(io.BytesIO(font_data), max(1, int(fontsize * 0.6875)))
+
+def attach_sprites():
+    """Give the player and enemies their prebuilt sprite frame tables"""
+    world.player.frames = sprites.frames("player")
+    for enemy in world.enemies:
+        enemy.frames = sprites.frames(enemy.enemy_type)
+
+def save_recording():
+    """Write the current run's replay file, if there is anything to save"""
+    if recorder and recorder.hashes:
+        try:
+            recorder.save(options.record)
+        except Exception as e:
+            print(f"Error saving replay: {e}")
+
+def toggle_profiler():
+    """Turn the frame profiler and its overlay on or off"""
+    profiler.enabled = not profiler.enabled
+    world.profiler = profiler if profiler.enabled else None
+    if dirty_renderer:
+        dirty_renderer.profiler = world.profiler
+        # The overlay isn't part of the renderer's background, so repaint everything
+        dirty_renderer.invalidate()
+
+def export_profile():
+    """Write the profiler's recorded frames, if any, when the game exits"""
+    if profiler.frames:
+        path = options.profile or PROFILE_FILE
+        try:
+            profiler.export(path)
+            print(f"Frame profile written to {path}")
+        except Exception as e:
+            print(f"Error exporting frame profile: {e}")
+
 def play_background_music():
     """Play background music if enabled and in the right game state"""
     if music_on and (game_state == MENU or game_state == PLAYING):
@@ -196,26 +374,6 @@ def restore_music_volume():
         except Exception as e:
             print(f"Error restoring music volume: {e}")
 
-def schedule_restore_volume():
-    """Schedule restoring the music volume after a short delay"""
-    clock.schedule(restore_music_volume, 1.5)  # one and half second delay
-
-def is_valid_move(x, y):
-    # First, check window boundaries directly
-    if not (0 <= x < WIDTH - CELL_SIZE and 0 <= y < HEIGHT - CELL_SIZE):
-        return False
-        
-    # Then, convert pixel coordinates to grid coordinates
-    grid_x = int(x / CELL_SIZE)
-    grid_y = int(y / CELL_SIZE)
-    
-    # Finally check if position is within map bounds and not a wall
-    if (0 <= grid_x < len(game_map[0]) and 
-        0 <= grid_y < len(game_map) and 
-        game_map[grid_y][grid_x] != 1):  # Allow collectibles (2) or empty space (0)
-        return True
-    return False
-
 def toggle_music():
     global music_on, menu
     music_on = not music_on
@@ -243,34 +401,23 @@ def play_sound(sound_file):
         return
     
     try:
-        # First lower the music volume to make the sound effect more audible
-        if game_state == PLAYING and music_on and (sound_file == "gem_collect" or sound_file == "hurt"):
-            lower_music_volume()
-            
-        # Play the sound if it exists
-        if hasattr(sounds, sound_file):
-            sound = getattr(sounds, sound_file)
-            
-            # Use loops for important sounds
-            if sound_file == "gem_collect":
-                sound.play()
-                clock.schedule(lambda: sound.play(), 0.1)  # Play twice for emphasis
-            else:
-                sound.play()
-                
-            # Schedule restoring the music volume
-            if game_state == PLAYING and music_on and (sound_file == "gem_collect" or sound_file == "hurt"):
-                schedule_restore_volume()
-        else:
+        if sound_file not in sound_manager:
             print(f"Sound '{sound_file}' not found")
+            return
+        
+        # Lower the music volume to make the sound effect more audible - repeats extend the same timer
+        if game_state == PLAYING and music_on and sound_file in DUCKING_SOUNDS:
+            sound_manager.duck_music()
+        
+        # Repeats within a few milliseconds of each other are played once
+        sound_manager.play(sound_file)
     except Exception as e:
         print(f"Error playing sound {sound_file}: {e}")
 
 def stop_sound(sound_file):
     """Stop a currently playing sound"""
     try:
-        if hasattr(sounds, sound_file):
-            getattr(sounds, sound_file).stop()
+        sound_manager.stop(sound_file)
     except Exception as e:
         print(f"Error stopping sound {sound_file}: {e}")
 
@@ -285,78 +432,181 @@ def draw_gem(screen, x, y):
     # Draw a shine
     screen.draw.filled_circle((x + 2, y - 2), 2, (255, 255, 255))
 
-def draw():
+def draw_map(screen):
+    """Blit the cached map tiles in view"""
+    if profiler.enabled:
+        profiler.start()
+    map_tiles.draw(screen, world, camera)
+    if profiler.enabled:
+        profiler.stop(MAP_DRAW)
+
+def draw_gems(screen):
+    """Draw the collectibles in view"""
+    if profiler.enabled:
+        profiler.start()
+    visible = world.collectibles.within(*camera.visible_cells())
+    if use_custom_gems:
+        # Every gem shares one cached surface, centred in its cell, drawn in one batched blit
+        gem = transform_cache.get('gem', GEM_SCALE)
+        offset_x = (CELL_SIZE - gem.get_width()) // 2 - camera.view.x
+        offset_y = (CELL_SIZE - gem.get_height()) // 2 - camera.view.y
+        screen.surface.blits([(gem, (x + offset_x, y + offset_y)) for x, y in visible], False)
+    else:
+        # Draw collectibles using the original method
+        for x, y in visible:
+            x, y = camera.to_screen(x, y)
+            draw_gem(screen, x + CELL_SIZE // 2, y + CELL_SIZE // 2)
+    if profiler.enabled:
+        profiler.stop(GEM_DRAW)
+
+def draw_swarm(screen, alpha=1.0):
+    """Draw the swarm enemies in view in one batched blit"""
+    world.swarm.draw(screen, swarm_frames, alpha, camera.view, swarm_sizes)
+
+def follow_player(alpha=1.0):
+    """Centre the camera on the player, between its last two positions"""
+    x, y = world.player.draw_position(alpha)
+    camera.follow(x + CELL_SIZE // 2, y + CELL_SIZE // 2, world.width, world.height)
+
+def draw_enemies(screen, alpha=1.0):
+    """Draw the enemies in view"""
+    for enemy in world.enemies:
+        # Sprites are bigger than a cell, so test the frame's own size
+        x, y = enemy.draw_position(alpha)
+        width, height = enemy.frames[enemy.direction][enemy.frame].get_size()
+        if camera.sees(x, y, width, height):
+            enemy.draw(screen, alpha, camera.offset)
+
+def draw_loading(screen):
+    """Loading screen - the title and a bar filled as the preloader decodes assets"""
     screen.clear()
+    text_cache.draw(screen, TITLE, (WIDTH // 2, HEIGHT // 2 - 60), fontsize=60, anchor=TOP_CENTER)
+    done = Rect(LOADING_BAR.x, LOADING_BAR.y, int(LOADING_BAR.width * preloader.progress()), LOADING_BAR.height)
+    screen.draw.filled_rect(done, (50, 200, 200))
+    screen.draw.rect(LOADING_BAR, "white")
+    text_cache.draw(screen, f"Loading {preloader.done}/{len(preloader)}",
+                    (WIDTH // 2, LOADING_BAR.bottom + 15), fontsize=30, anchor=TOP_CENTER)
+
+def draw():
+    if game_state == LOADING:
+        draw_loading(screen)
+        return
+    
+    if game_state == PLAYING:
+        follow_player(render_alpha)
+    
+    if dirty_renderer:
+        if game_state == PLAYING:
+            # Only the regions that changed are redrawn - see present()
+            dirty_renderer.draw(screen, world, render_alpha)
+            end_profiled_frame(screen)
+            return
+        dirty_renderer.invalidate()
     
     if game_state == MENU:
+        # The pre-rendered menu covers the whole screen, so there's nothing to clear
         menu.draw(screen)
-    elif game_state == PLAYING:
-        # Fill background with black (important for contrast)
-        screen.fill((0, 0, 0))
-        
-        # Draw map (simple version)
-        for y, row in enumerate(game_map):
-            for x, cell in enumerate(row):
-                if cell == 1:  # Wall
-                    screen.draw.filled_rect(Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE), (100, 100, 100))
-                
-                # Debug grid (optional - helpful for seeing boundaries)
-                # screen.draw.rect(Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE), (50, 50, 50))
-        
-        # Draw collectibles
-        if use_custom_gems and gem_actors:
-            # Draw collectibles using gem actors
-            for i, (x, y) in enumerate(collectibles):
-                if i < len(gem_actors) and gem_actors[i] is not None:
-                    try:
-                        gem_actors[i].draw()
-                    except Exception as e:
-                        print(f"Error drawing gem actor: {e}")
-                        draw_gem(screen, x + CELL_SIZE // 2, y + CELL_SIZE // 2)
-                else:
-                    # Fallback if something is wrong with the actor
-                    draw_gem(screen, x + CELL_SIZE // 2, y + CELL_SIZE // 2)
-        else:
-            # Draw collectibles using the original method
-            for x, y in collectibles:
-                draw_gem(screen, x + CELL_SIZE // 2, y + CELL_SIZE // 2)
+        return
+    
+    screen.clear()
+    
+    if game_state == PLAYING:
+        # Draw map (floor, walls and bottom boundary in one blit)
+        draw_map(screen)
         
-        # Add boundary visualization at bottom of screen if needed
-        for x in range(WIDTH // CELL_SIZE):
-            if y * CELL_SIZE >= HEIGHT - CELL_SIZE:
-                screen.draw.filled_rect(Rect(x * CELL_SIZE, HEIGHT - CELL_SIZE, CELL_SIZE, CELL_SIZE), (100, 100, 100))
+        # Draw collectibles - they come from the map, so there's no pickup list to keep
+        draw_gems(screen)
+        world.collectibles.drain()
         
-        # Draw player
-        player.draw(screen)
+        # Draw player, between its last two positions
+        if profiler.enabled:
+            profiler.start()
+        world.player.draw(screen, render_alpha, camera.offset)
         
         # Draw enemies
-        for enemy in enemies:
-            enemy.draw(screen)
+        draw_enemies(screen, render_alpha)
+        draw_swarm(screen, render_alpha)
+        if profiler.enabled:
+            profiler.stop(ENTITY_DRAW)
         
         # Draw UI
         draw_ui(screen)
+        end_profiled_frame(screen)
         
     elif game_state == GAME_OVER:
-        screen.draw.text("Game Over", (WIDTH // 2, HEIGHT // 2 - 50), centerx=WIDTH // 2, color="white", fontsize=60)
-        screen.draw.text(f"Score: {score}", (WIDTH // 2, HEIGHT // 2), centerx=WIDTH // 2, color="white", fontsize=40)
-        screen.draw.text("Click to return to menu", (WIDTH // 2, HEIGHT // 2 + 50), centerx=WIDTH // 2, color="white", fontsize=30)
+        text_cache.draw(screen, "Game Over", (WIDTH // 2, HEIGHT // 2 - 50), fontsize=60, anchor=TOP_CENTER)
+        text_cache.draw(screen, f"Score: {world.score}", (WIDTH // 2, HEIGHT // 2), fontsize=40, anchor=TOP_CENTER)
+        text_cache.draw(screen, "Click to return to menu", (WIDTH // 2, HEIGHT // 2 + 50), fontsize=30, anchor=TOP_CENTER)
     
     elif game_state == WIN:
-        screen.draw.text("You Win!", (WIDTH // 2, HEIGHT // 2 - 50), centerx=WIDTH // 2, color="white", fontsize=60)
-        screen.draw.text(f"Score: {score}", (WIDTH // 2, HEIGHT // 2), centerx=WIDTH // 2, color="white", fontsize=40)
-        screen.draw.text("Click to return to menu", (WIDTH // 2, HEIGHT // 2 + 50), centerx=WIDTH // 2, color="white", fontsize=30)
+        text_cache.draw(screen, "You Win!", (WIDTH // 2, HEIGHT // 2 - 50), fontsize=60, anchor=TOP_CENTER)
+        text_cache.draw(screen, f"Score: {world.score}", (WIDTH // 2, HEIGHT // 2), fontsize=40, anchor=TOP_CENTER)
+        text_cache.draw(screen, "Click to return to menu", (WIDTH // 2, HEIGHT // 2 + 50), fontsize=30, anchor=TOP_CENTER)
+
+def end_profiled_frame(screen):
+    """Close the profiler's frame and draw its overlay on top of the playing screen"""
+    if not profiler.enabled:
+        return
+    profiler.end_frame()
+    
+    screen.draw.filled_rect(PROFILER_RECT, (0, 0, 0))
+    text_cache.draw(screen, "Frame profile (ms)", (PROFILER_RECT.x + 8, PROFILER_RECT.y + 6), fontsize=20, color="yellow")
+    for row, (phase, milliseconds) in enumerate(profiler.averages().items()):
+        y = PROFILER_RECT.y + 28 + row * 20
+        text_cache.draw(screen, phase, (PROFILER_RECT.x + 8, y), fontsize=20)
+        text_cache.draw(screen, f"{milliseconds:.3f}", (PROFILER_RECT.right - 8, y), fontsize=20, anchor=TOP_RIGHT)
+
+def is_idle():
+    """True on a static screen with no state change left to handle - the game loop then sleeps until input"""
+    return game_state not in (PLAYING, LOADING) and game_state == previous_game_state
+
+def present():
+    """Push the finished frame to the display, called by the game loop after draw()"""
+    if dirty_renderer and dirty_renderer.dirty_rects is not None:
+        rects = dirty_renderer.dirty_rects
+        if profiler.enabled:
+            rects = rects + [PROFILER_RECT]
+        pygame.display.update(rects)
+    else:
+        pygame.display.flip()
 
 def draw_ui(screen):
+    if profiler.enabled:
+        profiler.start()
+    
     # Draw score
-    score_text = f"Score: {score}"
-    screen.draw.text(score_text, (WIDTH - 20, 20), right=WIDTH - 20, color="white", fontsize=30)
+    score_text = f"Score: {world.score}"
+    text_cache.draw(screen, score_text, (WIDTH - 20, 20), fontsize=30, anchor=TOP_RIGHT)
     
     # Draw collected items
-    collect_text = f"Gems: {collected}/{total_collectibles}"
-    screen.draw.text(collect_text, (WIDTH - 20, 50), right=WIDTH - 20, color="white", fontsize=30)
+    collect_text = f"Gems: {world.collected}/{world.total_collectibles}"
+    text_cache.draw(screen, collect_text, (WIDTH - 20, 50), fontsize=30, anchor=TOP_RIGHT)
+    if profiler.enabled:
+        profiler.stop(UI_DRAW)
 
-def update():
-    global game_state, previous_game_state, player, enemies, collectibles, collected, score, game_over_sound_playing, win_sound_playing, gem_actors
+def tick():
+    """Run one fixed logic tick of the game world"""
+    global game_state
+    
+    # Advance the simulation and play sounds for whatever happened
+    for event in world.step():
+        play_sound(event)
+    if recorder:
+        recorder.record_tick(world)
+    
+    # Pick up win/lose transitions from the world
+    if world.state != PLAYING:
+        game_state = world.state
+        save_recording()
+
+def update(dt):
+    global game_state, previous_game_state, game_over_sound_playing, win_sound_playing, render_alpha
+    
+    if game_state == LOADING:
+        # Pick up whatever the preloader has decoded; the game starts at the menu once it's all in
+        if preloader.poll():
+            finish_loading()
+        return
     
     # Check for game state transitions
     if game_state != previous_game_state:
@@ -377,55 +627,15 @@ def update():
         previous_game_state = game_state
     
     if game_state == PLAYING:
-        # First check if the player's target position is valid before updating
-        if player.is_moving and not is_valid_move(player.target_x, player.target_y):
-            player.cancel_movement()
-        
-        # Now update player with validated movement
-        player.update()
-        
-        # Check for collectible collection
-        player_rect = player.get_rect()
-        for i, (x, y) in enumerate(collectibles[:]):
-            collectible_rect = Rect(x + 10, y + 10, CELL_SIZE - 20, CELL_SIZE - 20)
-            if player_rect.colliderect(collectible_rect):
-                score += 100  # Add points directly to the global score (100 per gem)
-                collectibles.pop(i)
-                
-                # Also remove the corresponding gem actor
-                if i < len(gem_actors):
-                    gem_actors.pop(i)
-                    
-                collected += 1
-                play_sound("gem_collect")  # Play gem collection sound
-                
-                # Update map to remove the collected gem
-                grid_x = x // CELL_SIZE
-                grid_y = y // CELL_SIZE
-                game_map[grid_y][grid_x] = 0
+        # Run as many fixed ticks as the real time since the last frame covers
+        for _ in range(timestep.advance(dt)):
+            tick()
+            if game_state != PLAYING:
                 break
-        
-        # Update enemies
-        for enemy in enemies:
-            # First check if the enemy's target position is valid
-            if enemy.is_moving and not is_valid_move(enemy.target_x, enemy.target_y):
-                enemy.change_direction()
-                
-            # Now update enemy with validated movement
-            enemy.update()
-            
-            # Check for collision between player and enemy
-            if enemy.collides_with(player):
-                if player.take_damage():  # Only play sound if damage was actually taken
-                    play_sound("hurt")
-                
-                # Check if player is dead
-                if player.is_dead():
-                    game_state = GAME_OVER
-        
-        # Check win condition
-        if collected >= total_collectibles:
-            game_state = WIN
+        render_alpha = timestep.alpha
+    else:
+        # Time spent outside the game isn't caught up afterwards
+        timestep.reset()
 
 def on_mouse_down(pos):
     global game_state, game_over_sound_playing, win_sound_playing
@@ -461,24 +671,42 @@ def on_mouse_down(pos):
 
 def on_key_down(key):
     global game_state
+    if game_state == LOADING:
+        return
+    
+    if key == keys.F3:
+        toggle_profiler()
+    
     if game_state == PLAYING:
-        # Only process movement if player isn't already moving
-        if not player.is_moving:
-            if key == keys.UP or key == keys.W:
-                player.move_up()
-            elif key == keys.DOWN or key == keys.S:
-                player.move_down()
-            elif key == keys.LEFT or key == keys.A:
-                player.move_left()
-            elif key == keys.RIGHT or key == keys.D:
-                player.move_right()
+        direction = None
+        if key == keys.UP or key == keys.W:
+            direction = UP
+        elif key == keys.DOWN or key == keys.S:
+            direction = DOWN
+        elif key == keys.LEFT or key == keys.A:
+            direction = LEFT
+        elif key == keys.RIGHT or key == keys.D:
+            direction = RIGHT
+        
+        # Only process movement if player isn't already moving - the move lands before the next tick
+        if direction is not None and world.move_player(direction) and recorder:
+            recorder.record_input(world.ticks, direction)
+        
+        if key == keys.F5:
+            save_game()
+        elif key == keys.F9:
+            load_game()
         
         if key == keys.ESCAPE:
             game_state = MENU
             play_sound("select")
 
-# Initialize game on startup
-initialize_game()
+# Decode sprites and sounds in the background - the game is set up once they're all in
+start_loading()
+
+# Keep a run that is still in progress when the window closes, and the frame profile
+atexit.register(save_recording)
+atexit.register(export_profile)
 
 # Start the game
-pgzrun.go()
\ No newline at end of file
+game_loop.go()
\ No newline at end of file
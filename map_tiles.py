@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+import pygame
+from pygame.rect import Rect
+
+TILE_CELLS = 8  # Map cells per tile side
+MAX_TILES = 16  # Tiles kept - a window's view needs at most 9 of 400x400 pixels
+
+
+class MapTiles:
+    """The map's floor and walls pre-rendered in square tiles, kept for reuse with least-recently-used eviction.
+
+    Drawing blits only the tiles that overlap the camera's view, and a tile
+    is rendered the first time it comes into view, so the cost of a frame
+    doesn't grow with the size of the map and scrolling renders a few
+    small tiles at a time instead of a whole layer. Tiles are dropped when
+    the world's map_version changes.
+    """
+
+    def __init__(self, cell_size, wall_color, tile_cells=TILE_CELLS, max_tiles=MAX_TILES):
+        self.cell_size = cell_size
+        self.wall_color = wall_color
+        self.tile_cells = tile_cells
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()  # (tile_x, tile_y) -> Surface
+        self.map_version = None  # World map_version the tiles were rendered from
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def clear(self):
+        """Forget every tile, e.g. when the world is replaced"""
+        self.tiles.clear()
+        self.map_version = None
+
+    def build_tile(self, world, tile_x, tile_y):
+        """Render one tile's floor and walls"""
+        cell_size = self.cell_size
+        tile_cells = self.tile_cells
+        grid_x0, grid_y0 = tile_x * tile_cells, tile_y * tile_cells
+
+        # Fill background with black (important for contrast)
+        tile = pygame.Surface((tile_cells * cell_size, tile_cells * cell_size))
+        tile.fill((0, 0, 0))
+
+        cells = world.game_map[grid_y0:grid_y0 + tile_cells, grid_x0:grid_x0 + tile_cells]
+        wall_ys, wall_xs = (cells == 1).nonzero()
+        for x, y in zip(wall_xs.tolist(), wall_ys.tolist()):
+            tile.fill(self.wall_color, Rect(x * cell_size, y * cell_size, cell_size, cell_size))
+
+        # Boundary visualization - the bottom row of the play area is outside it
+        tile.fill(self.wall_color, Rect(0, world.height - cell_size - grid_y0 * cell_size,
+                                        max(0, world.map_width - grid_x0) * cell_size, cell_size))
+        return tile
+
+    def tile(self, world, tile_x, tile_y):
+        """A tile's surface, rendering it on a miss"""
+        key = (tile_x, tile_y)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+
+        tile = self.build_tile(world, tile_x, tile_y)
+        self.tiles[key] = tile
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def draw(self, screen, world, camera):
+        """Blit the tiles in the camera's view"""
+        if self.map_version != world.map_version:
+            self.tiles.clear()
+            self.map_version = world.map_version
+
+        tile_cells = self.tile_cells
+        tile_size = tile_cells * self.cell_size
+        grid_x0, grid_y0, grid_x1, grid_y1 = camera.visible_cells()
+        offset_x, offset_y = camera.offset
+        screen.surface.blits([(self.tile(world, tile_x, tile_y),
+                               (tile_x * tile_size - offset_x, tile_y * tile_size - offset_y))
+                              for tile_y in range(grid_y0 // tile_cells, (grid_y1 - 1) // tile_cells + 1)
+                              for tile_x in range(grid_x0 // tile_cells, (grid_x1 - 1) // tile_cells + 1)], False)
@@ -1,9 +1,14 @@
+import pygame
 from pygame.rect import Rect
+from pgzero.screen import Screen
+
+from text_cache import TextCache, TOP_CENTER, CENTER
 
 class Menu:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, text_cache=None):
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.text_cache = text_cache if text_cache is not None else TextCache()  # Rendered title and labels
         
         # Define button positions and sizes
         button_width = 200
@@ -22,15 +27,28 @@ class Menu:
         self.music_on = True
         self.sound_on = True
         
+        # The whole menu pre-rendered, and the (music_on, sound_on) state it shows
+        self.surface = None
+        self.surface_state = None
+        
     def update_button_states(self, music_on, sound_on):
         """Update the button states to reflect the current settings"""
         self.music_on = music_on
         self.sound_on = sound_on
     
     def draw(self, screen):
+        """Blit the pre-rendered menu, rebuilding it first if the music or sound state changed"""
+        state = (self.music_on, self.sound_on)
+        if self.surface is None or self.surface_state != state:
+            self.surface = pygame.Surface((self.screen_width, self.screen_height))
+            self.render(Screen(self.surface))
+            self.surface_state = state
+        screen.surface.blit(self.surface, (0, 0))
+    
+    def render(self, screen):
         # Draw title
-        screen.draw.text("Roguelike Adventure", (self.screen_width // 2, 100), 
-                         centerx=self.screen_width // 2, color="white", fontsize=60)
+        self.text_cache.draw(screen, "Roguelike Adventure", (self.screen_width // 2, 100),
+                             fontsize=60, anchor=TOP_CENTER)
         
         # Draw buttons with different colors for on/off states
         self.draw_button(screen, self.start_button, "Start Game", (100, 100, 200))
@@ -48,7 +66,7 @@ class Menu:
     def draw_button(self, screen, rect, text, color):
         screen.draw.filled_rect(rect, color)
         screen.draw.rect(rect, (255, 255, 255))
-        screen.draw.text(text, rect.center, centerx=rect.centerx, centery=rect.centery, color="white")
+        self.text_cache.draw(screen, text, rect.center, anchor=CENTER)
     
     def check_button_click(self, pos):
         # Check if any button was clicked
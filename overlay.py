@@ -0,0 +1,160 @@
+"""Copy-on-write game maps: a shared read-only level plus the cells one run changed.
+
+A LevelOverlay stands in for a per-run copy of the level in a GameWorld.
+The level itself is never written, so any number of worlds can play the
+same level array at once, and starting a run is a new overlay rather
+than a copy of every cell - the previous run's changes are simply
+dropped.
+"""
+import weakref
+
+import numpy as np
+
+# Gem counts of base levels, by id - a base level is never written, so its count never changes
+gem_counts = {}
+
+
+def base_level(level):
+    """A level as a read-only uint8 array that overlays can share - as is, or a read-only view, if it already is one"""
+    level = np.asarray(level, dtype=np.uint8)
+    if level.flags.writeable:
+        level = level.view()
+        level.flags.writeable = False
+    return level
+
+
+def gem_count(base):
+    """Number of gem (2) cells in a base level, counted once however many worlds play it"""
+    cached = gem_counts.get(id(base))
+    if cached is not None and cached[0]() is base:
+        return cached[1]
+    count = int(np.count_nonzero(base == 2))
+    gem_counts[id(base)] = (weakref.ref(base), count)
+    weakref.finalize(base, gem_counts.pop, id(base), None)
+    return count
+
+
+class LevelOverlay:
+    """A level's cells as a shared base array plus this overlay's changed cells, in place of a [grid_y, grid_x] array.
+
+    Supports the indexing the game uses on its map - a single cell, arrays
+    of cells and rectangular slices - and setting single cells, like a
+    ChunkedLevel. Reads come from the base, with the changed cells patched
+    in: only cells whose base value some change overwrote (the gems, in
+    play) are looked up, so reads cost next to nothing more than the base
+    array's while a run changes a few cells.
+    """
+
+    def __init__(self, base):
+        self.base = base_level(base)
+        self.shape = self.base.shape
+        self.changes = {}  # (grid_x, grid_y) -> value, only for cells that differ from the base
+        self.overwritten = set()  # Base values of changed cells - no other cell can differ from the base
+        self.written = set()  # Values changed cells were set to
+
+        # changes as arrays sorted by flat cell index, for patching many cells at once; rebuilt when stale
+        self.changed_ids = None
+        self.changed_values = None
+
+    @classmethod
+    def from_array(cls, base, cells):
+        """An overlay on base holding every cell where cells differs from it"""
+        overlay = cls(base)
+        grid_ys, grid_xs = np.nonzero(overlay.base != cells)
+        for grid_x, grid_y in zip(grid_xs.tolist(), grid_ys.tolist()):
+            overlay[grid_y, grid_x] = cells[grid_y, grid_x]
+        return overlay
+
+    def to_array(self):
+        """A new writable array of every cell, with the changes applied"""
+        cells = self.base.copy()
+        for (grid_x, grid_y), value in self.changes.items():
+            cells[grid_y, grid_x] = value
+        return cells
+
+    def clear(self):
+        """Drop every change, back to the base level"""
+        self.changes.clear()
+        self.overwritten.clear()
+        self.written.clear()
+        self.changed_ids = None
+
+    def unchanged(self, value):
+        """True if no cell was changed to or from value, so the base alone tells which cells hold it"""
+        return value not in self.overwritten and value not in self.written
+
+    def __getitem__(self, key):
+        grid_y, grid_x = key
+        changes = self.changes
+        if isinstance(grid_y, slice):
+            cells = self.base[key]
+            if changes:
+                height, width = self.shape
+                cells = self.patch(cells, grid_x.indices(width)[0], grid_y.indices(height)[0])
+            return cells
+
+        if np.ndim(grid_y) == 0:
+            value = changes.get((int(grid_x), int(grid_y)))
+            return self.base[grid_y, grid_x] if value is None else np.uint8(value)
+
+        values = self.base[grid_y, grid_x]
+        if changes:
+            values = self.patch(values, np.asarray(grid_x), np.asarray(grid_y))
+        return values
+
+    def __setitem__(self, key, value):
+        grid_y, grid_x = key
+        cell = (int(grid_x), int(grid_y))
+        value = int(value)
+        base_value = int(self.base[grid_y, grid_x])
+        if value == base_value:
+            if self.changes.pop(cell, None) is None:
+                return
+        else:
+            self.changes[cell] = value
+            self.overwritten.add(base_value)
+            self.written.add(value)
+        self.changed_ids = None
+
+    def patch(self, values, grid_xs, grid_ys):
+        """values read from the base with the changed cells applied - a copy if any changed.
+
+        grid_xs and grid_ys are the cells' coordinates, broadcast against
+        values, or ints for the top-left cell of a slice.
+        """
+        overwritten = self.overwritten
+        if len(overwritten) == 1:
+            maybe = values == next(iter(overwritten))
+        else:
+            maybe = np.isin(values, list(overwritten))
+        candidates = np.flatnonzero(maybe)
+        if len(candidates) == 0:
+            return values
+
+        if self.changed_ids is None:
+            width = self.shape[1]
+            changed_ids = np.fromiter((grid_y * width + grid_x for grid_x, grid_y in self.changes),
+                                      np.int64, len(self.changes))
+            changed_values = np.fromiter(self.changes.values(), np.uint8, len(self.changes))
+            order = np.argsort(changed_ids)
+            # A last id no cell has, so a search past every change still reads a valid position
+            self.changed_ids = np.append(changed_ids[order], np.iinfo(np.int64).max)
+            self.changed_values = np.append(changed_values[order], 0)
+
+        width = self.shape[1]
+        if np.ndim(grid_xs) == 0:
+            # A slice - the candidates are offsets into it, from its top-left cell
+            rows, columns = np.divmod(candidates, values.shape[1])
+            ids = (rows + grid_ys) * width + (columns + grid_xs)
+        else:
+            if grid_xs.shape != values.shape or grid_ys.shape != values.shape:
+                grid_xs, grid_ys = np.broadcast_arrays(grid_xs, grid_ys)
+            ids = grid_ys.reshape(-1)[candidates] * width + grid_xs.reshape(-1)[candidates]
+        positions = np.searchsorted(self.changed_ids, ids)
+        changed = np.flatnonzero(self.changed_ids[positions] == ids)
+        if len(changed) == 0:
+            return values
+
+        values = values.copy()
+        values.reshape(-1)[candidates[changed]] = self.changed_values[positions[changed]]
+        return values
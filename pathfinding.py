@@ -0,0 +1,189 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from direction import UP, DOWN, LEFT, RIGHT
+
+# No way to the goal from this cell (or it is the goal)
+NO_DIRECTION = -1
+
+# Extra cells read around a flow field's window, so the goal can move this far before the walls are read again
+WINDOW_MARGIN = 8
+
+
+class Pathfinder:
+    """Grid pathfinding over a GameWorld's map.
+
+    Offers A* queries between two cells and a flow field toward a goal: for
+    every cell within max_distance steps of the goal, the direction of the
+    next step on a shortest path. The flow field is cached and only
+    recomputed when the goal moves to another cell or the walls change, so
+    an enemy following it costs one array lookup per tick. With a
+    max_distance, the field only covers the window of cells that far from
+    the goal, so its cost doesn't depend on the size of the map.
+
+    A moved goal gets a full search rather than a repaired one: on a grid,
+    stepping the goal to a neighbouring cell changes the distance of every
+    reachable cell by one, so a repair would rewrite the whole field. Only the
+    walkable cells are reused, from a window WINDOW_MARGIN cells wider.
+    """
+
+    def __init__(self, world, max_distance=None):
+        self.world = world
+        self.max_distance = max_distance  # Limit on flow field size; None covers the whole map
+
+        self.walkable = None
+        self.walkable_bytes = None  # Same cells flattened, for fast per-cell reads in the BFS
+        self.walkable_key = None
+        self.goal = None
+        self.field_key = None
+        self.field_window = None  # (x0, y0, x1, y1) of walkable cells the flow field was last searched in
+        self.field_origin = (0, 0)  # (grid_x, grid_y) of the flow field arrays' first cell
+        self.distances = None
+        self.directions = None
+
+    def walkable_cells(self, window=None):
+        """Bool array of cells an entity may stand on, in an (x0, y0, x1, y1) window of the map.
+
+        Indexed [grid_y - y0, grid_x - x0]; the whole map by default.
+        """
+        world = self.world
+        if window is None:
+            window = (0, 0, world.map_width, world.map_height)
+        key = (window, world.map_version)
+        if self.walkable is None or self.walkable_key != key:
+            x0, y0, x1, y1 = window
+            grid_ys, grid_xs = np.indices((y1 - y0, x1 - x0))
+            self.walkable = world.valid_moves((grid_xs + x0) * world.cell_size, (grid_ys + y0) * world.cell_size)
+            self.walkable_bytes = self.walkable.astype(np.uint8).tobytes()
+            self.walkable_key = key
+        return self.walkable
+
+    def find_path(self, start, goal):
+        """A* shortest path between (grid_x, grid_y) cells.
+
+        Returns the list of cells from start to goal inclusive, or None if
+        the goal can't be reached.
+        """
+        walkable = self.walkable_cells()
+        height, width = walkable.shape
+        if not (walkable[start[1], start[0]] and walkable[goal[1], goal[0]]):
+            return None
+
+        goal_x, goal_y = goal
+        came_from = {start: None}
+        cost = {start: 0}
+        open_cells = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+        while open_cells:
+            _, steps, cell = heapq.heappop(open_cells)
+            if cell == goal:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path[::-1]
+            if steps > cost[cell]:
+                continue  # Stale queue entry
+            x, y = cell
+            for next_cell in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                next_x, next_y = next_cell
+                if not (0 <= next_x < width and 0 <= next_y < height and walkable[next_y, next_x]):
+                    continue
+                if next_cell not in cost or steps + 1 < cost[next_cell]:
+                    cost[next_cell] = steps + 1
+                    came_from[next_cell] = cell
+                    estimate = steps + 1 + abs(next_x - goal_x) + abs(next_y - goal_y)
+                    heapq.heappush(open_cells, (estimate, steps + 1, next_cell))
+        return None
+
+    def set_goal(self, cell):
+        """Point the flow field at a (grid_x, grid_y) cell - recomputed lazily"""
+        self.goal = cell
+
+    def flow_field(self):
+        """(distances, directions) arrays toward the goal, rebuilt only if the goal or walls changed.
+
+        They cover the window of the map starting at field_origin.
+        """
+        key = (self.goal, self.world.map_version)
+        if self.field_key != key:
+            self.build_flow_field()
+            self.field_key = key
+        return self.distances, self.directions
+
+    def build_flow_field(self):
+        """Breadth-first Dijkstra outward from the goal (every step costs the same)"""
+        world = self.world
+        self.field_origin = (0, 0)
+        if self.goal is None or not (0 <= self.goal[0] < world.map_width and 0 <= self.goal[1] < world.map_height):
+            self.distances = np.full((1, 1), -1, dtype=np.int32)
+            self.directions = np.full((1, 1), NO_DIRECTION, dtype=np.int8)
+            return
+
+        # Nothing further than max_distance steps away can be reached, so only that window is searched
+        goal_x, goal_y = self.goal
+        window = None
+        if self.max_distance is not None:
+            x0, y0 = max(0, goal_x - self.max_distance), max(0, goal_y - self.max_distance)
+            x1 = min(world.map_width, goal_x + self.max_distance + 1)
+            y1 = min(world.map_height, goal_y + self.max_distance + 1)
+            # Keep the last window while it still holds the search and its walkable cells are cached
+            window = self.field_window
+            if (self.walkable_key != (window, world.map_version) or
+                    not (window[0] <= x0 and window[1] <= y0 and x1 <= window[2] and y1 <= window[3])):
+                reach = self.max_distance + WINDOW_MARGIN
+                window = (max(0, goal_x - reach), max(0, goal_y - reach),
+                          min(world.map_width, goal_x + reach + 1), min(world.map_height, goal_y + reach + 1))
+            self.field_window = window
+            self.field_origin = window[:2]
+        walkable = self.walkable_cells(window)
+        height, width = walkable.shape
+        self.distances = np.full((height, width), -1, dtype=np.int32)
+        self.directions = np.full((height, width), NO_DIRECTION, dtype=np.int8)
+
+        goal_x -= self.field_origin[0]
+        goal_y -= self.field_origin[1]
+        if not walkable[goal_y, goal_x]:
+            return
+
+        # Work on flat cell indexes with bytes and dicts - much faster per cell than NumPy scalars
+        walkable = self.walkable_bytes
+        size = height * width
+        max_distance = self.max_distance if self.max_distance is not None else size
+        goal = goal_y * width + goal_x
+        distances = {goal: 0}
+        directions = {}
+        queue = deque([goal])
+        while queue:
+            cell = queue.popleft()
+            distance = distances[cell]
+            if distance >= max_distance:
+                continue
+            x = cell % width
+            # Each neighbour steps back toward this cell, so it moves the opposite way
+            for neighbour, direction, inside in ((cell - width, DOWN, cell >= width),
+                                                 (cell + width, UP, cell + width < size),
+                                                 (cell - 1, RIGHT, x > 0),
+                                                 (cell + 1, LEFT, x < width - 1)):
+                if inside and neighbour not in distances and walkable[neighbour]:
+                    distances[neighbour] = distance + 1
+                    directions[neighbour] = direction
+                    queue.append(neighbour)
+
+        cells = np.fromiter(distances.keys(), dtype=np.intp, count=len(distances))
+        self.distances.ravel()[cells] = np.fromiter(distances.values(), dtype=np.int32, count=len(distances))
+        cells = np.fromiter(directions.keys(), dtype=np.intp, count=len(directions))
+        self.directions.ravel()[cells] = np.fromiter(directions.values(), dtype=np.int8, count=len(directions))
+
+    def directions_at(self, grid_xs, grid_ys):
+        """Flow field direction for many cells at once (NO_DIRECTION outside the field)"""
+        _, directions = self.flow_field()
+        height, width = directions.shape
+        origin_x, origin_y = self.field_origin
+        grid_xs = np.asarray(grid_xs, dtype=np.intp) - origin_x
+        grid_ys = np.asarray(grid_ys, dtype=np.intp) - origin_y
+        inside = (grid_xs >= 0) & (grid_xs < width) & (grid_ys >= 0) & (grid_ys < height)
+        result = np.full(len(grid_xs), NO_DIRECTION, dtype=np.int8)
+        result[inside] = directions[grid_ys[inside], grid_xs[inside]]
+        return result
@@ -1,6 +1,8 @@
 import math
 from pygame.rect import Rect
 
+from direction import UP, DOWN, LEFT, RIGHT, DIRECTION_NAMES
+
 class Player:
     def __init__(self, x, y, cell_size):
         # Position variables
@@ -9,15 +11,18 @@ class Player:
         self.target_x = x  # Target x position for movement
         self.target_y = y  # Target y position for movement
         self.move_speed = 5  # Pixels per frame 
+        self.previous_x = x  # Position at the start of the last tick, for interpolated drawing
+        self.previous_y = y
         self.cell_size = cell_size
         
         # Animation variables
-        self.direction = "down"  # Current facing direction
+        self.direction = DOWN  # Current facing direction
         self.frame = 0  # Current animation frame
         self.animation_speed = 0.1  # Time between frame changes 
         self.animation_timer = 0  # Timer for animation
         self.is_moving = False  # Whether the player is currently moving
         self.frames_per_direction = 4  # Number of frames in each animation
+        self.frames = None  # Sprite table [direction][frame] from the SpriteRegistry
         
         # Health system
         self.max_health = 3
@@ -29,19 +34,24 @@ class Player:
         # Limit movement to one cell at a time
         self.movement_locked = False
     
-    def update(self):
+    def update(self, dt=1.0):
+        # Advance one tick - dt is the tick length in 60 Hz frames, the unit speeds and timers are tuned in
+        self.previous_x = self.x
+        self.previous_y = self.y
+        step = self.move_speed * dt
+        
         # Update animation timer
-        self.animation_timer += 1
+        self.animation_timer += dt
         
         # Update invulnerability timer
         if self.invulnerable:
-            self.invulnerable_timer += 1
+            self.invulnerable_timer += dt
             if self.invulnerable_timer >= self.max_invulnerable_time:
                 self.invulnerable = False
                 self.invulnerable_timer = 0
         
         # If we reach the target position, stop moving
-        if self.is_moving and abs(self.x - self.target_x) < self.move_speed and abs(self.y - self.target_y) < self.move_speed:
+        if self.is_moving and abs(self.x - self.target_x) < step and abs(self.y - self.target_y) < step:
             self.x = self.target_x
             self.y = self.target_y
             self.is_moving = False
@@ -55,8 +65,8 @@ class Player:
             # Normalize direction vector
             distance = math.sqrt(dx * dx + dy * dy)
             if distance > 0:
-                dx = dx / distance * self.move_speed
-                dy = dy / distance * self.move_speed
+                dx = dx / distance * step
+                dy = dy / distance * step
             
             # Update position
             self.x += dx
@@ -74,16 +84,25 @@ class Player:
                 self.frame = (self.frame + 1) % self.frames_per_direction
                 self.animation_timer = 0
     
-    def draw(self, screen):
+    def draw_position(self, alpha=1.0):
+        # Position between the last two ticks - alpha 0 is the previous tick, 1 the current one
+        return (self.previous_x + (self.x - self.previous_x) * alpha,
+                self.previous_y + (self.y - self.previous_y) * alpha)
+    
+    def draw(self, screen, alpha=1.0, offset=(0, 0)):
         # Determine which sprite to use based on direction and frame
-        sprite_name = f"player/player_{self.direction}_{self.frame}"
+        if self.frames is not None:
+            sprite = self.frames[self.direction][self.frame]
+        else:
+            sprite = f"player/player_{DIRECTION_NAMES[self.direction]}_{self.frame}"
         
         # Draw the sprite at the current position with flashing effect if invulnerable
         if self.invulnerable and self.invulnerable_timer % 10 < 5:
             # Skip drawing to create flashing effect
             pass
         else:
-            screen.blit(sprite_name, (self.x, self.y))
+            x, y = self.draw_position(alpha)
+            screen.blit(sprite, (x - offset[0], y - offset[1]))
         
         # Draw health
         self.draw_health(screen)
@@ -101,6 +120,10 @@ class Player:
             # Draw a filled rect for the bottom of the heart
             screen.draw.filled_rect(Rect(heart_x - 5, heart_y, 20, 10), heart_color)
     
+    def get_health_rect(self):
+        # Return the screen area covered by the health hearts
+        return Rect(10, 10, 30 * self.max_health + 1, 21)
+    
     def take_damage(self):
         if not self.invulnerable:
             self.health -= 1
@@ -113,7 +136,7 @@ class Player:
     
     def move_up(self):
         if not self.is_moving:  # Only move if not already moving
-            self.direction = "up"
+            self.direction = UP
             # Store current position
             old_target_y = self.target_y
             # Set new target
@@ -123,7 +146,7 @@ class Player:
     
     def move_down(self):
         if not self.is_moving:  # Only move if not already moving
-            self.direction = "down"
+            self.direction = DOWN
             # Store current position
             old_target_y = self.target_y
             # Set new target
@@ -133,7 +156,7 @@ class Player:
     
     def move_left(self):
         if not self.is_moving:  # Only move if not already moving
-            self.direction = "left"
+            self.direction = LEFT
             # Store current position
             old_target_x = self.target_x
             # Set new target
@@ -143,7 +166,7 @@ class Player:
     
     def move_right(self):
         if not self.is_moving:  # Only move if not already moving
-            self.direction = "right"
+            self.direction = RIGHT
             # Store current position
             old_target_x = self.target_x
             # Set new target
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pygame
+
+PRELOAD_WORKERS = 4  # Decoding threads
+
+# Asset kinds in a manifest
+IMAGE = "image"
+SOUND = "sound"
+FONT = "font"
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class AssetPreloader:
+    """Decodes a manifest of image, sound and font files on a thread pool.
+
+    start() hands every file to the pool and returns at once, so the game
+    can keep drawing a loading screen. Each frame, poll() collects the
+    decodes that have finished - images are converted for the display
+    there, on the main thread - and progress() says how far along it is.
+    Once poll() returns True, images, sounds and fonts hold every asset by
+    name and nothing left to play needs to touch the disk. Fonts are kept
+    as the file's bytes, since pygame reads glyphs from a font file as they
+    are first drawn.
+    """
+
+    def __init__(self, images, sounds, fonts=None, workers=PRELOAD_WORKERS):
+        self.manifest = [(IMAGE, name, path) for name, path in sorted(images.items())]
+        self.manifest += [(SOUND, name, path) for name, path in sorted(sounds.items())]
+        self.manifest += [(FONT, name, path) for name, path in sorted((fonts or {}).items())]
+        self.workers = workers
+
+        self.images = {}  # Image name -> Surface
+        self.sounds = {}  # Sound name -> pygame Sound
+        self.fonts = {}  # Font name -> file contents
+        self.failed = []  # Names that couldn't be decoded
+        self.pending = {}  # Future -> (kind, name)
+        self.executor = None
+        self.done = 0
+        self.started = 0.0
+        self.elapsed = 0.0  # Seconds from start() until everything was collected
+
+    def __len__(self):
+        return len(self.manifest)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preload")
+        decoders = {IMAGE: pygame.image.load, SOUND: pygame.mixer.Sound, FONT: read_file}
+        for kind, name, path in self.manifest:
+            self.pending[self.executor.submit(decoders[kind], path)] = (kind, name)
+
+    def poll(self):
+        """Collect finished decodes; returns True once every asset is in"""
+        for future in [future for future in self.pending if future.done()]:
+            kind, name = self.pending.pop(future)
+            self.done += 1
+            try:
+                asset = future.result()
+            except Exception as e:
+                print(f"Error preloading {kind} {name}: {e}")
+                self.failed.append(name)
+                continue
+            if kind == IMAGE:
+                # Surfaces can only be converted for the display on the thread that owns it
+                if pygame.display.get_surface() is not None:
+                    asset = asset.convert_alpha()
+                self.images[name] = asset
+            elif kind == SOUND:
+                self.sounds[name] = asset
+            else:
+                self.fonts[name] = asset
+
+        if self.pending or self.executor is None:
+            return not self.pending
+        self.executor.shutdown()
+        self.executor = None
+        self.elapsed = time.perf_counter() - self.started
+        return True
+
+    def wait(self):
+        """Block until every asset is decoded, then collect them"""
+        wait(list(self.pending))
+        return self.poll()
+
+    def progress(self):
+        """Fraction of the manifest decoded so far"""
+        return self.done / len(self.manifest) if self.manifest else 1.0
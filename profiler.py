@@ -0,0 +1,96 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+# Phases timed each frame, in overlay and export order
+PLAYER_UPDATE = "player_update"
+COLLECTIBLE_SCAN = "collectible_scan"
+ENEMY_UPDATE = "enemy_update"
+MAP_DRAW = "map_draw"
+GEM_DRAW = "gem_draw"
+ENTITY_DRAW = "entity_draw"
+UI_DRAW = "ui_draw"
+PHASES = [PLAYER_UPDATE, COLLECTIBLE_SCAN, ENEMY_UPDATE, MAP_DRAW, GEM_DRAW, ENTITY_DRAW, UI_DRAW]
+
+# Frames of history kept (10 seconds at 60 frames per second)
+HISTORY_SIZE = 600
+
+
+class FrameProfiler:
+    """Per-phase frame timings kept in a fixed-size ring buffer.
+
+    Code being measured calls start() then stop(phase); time from several
+    start/stop pairs in one frame (e.g. several logic ticks) adds up. The
+    frame's totals go into the ring when end_frame() is called, so memory
+    use stays fixed however long the game runs. Callers check enabled (or
+    hold None instead of a profiler) first, so a disabled profiler costs
+    one test per phase.
+    """
+
+    def __init__(self, phases=PHASES, size=HISTORY_SIZE):
+        self.phases = list(phases)
+        self.phase_index = {phase: index for index, phase in enumerate(self.phases)}
+        self.size = size
+        self.enabled = False
+        self.clear()
+
+    def clear(self):
+        self.history = np.zeros((self.size, len(self.phases)))  # Seconds, one row per frame
+        self.frame_numbers = np.zeros(self.size, dtype=np.int64)
+        self.frames = 0  # Frames recorded so far; the next one goes in row frames % size
+        self.current = [0.0] * len(self.phases)
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self, phase):
+        """Add the time since start() to phase"""
+        self.current[self.phase_index[phase]] += time.perf_counter() - self.started
+
+    def end_frame(self):
+        """Store this frame's phase totals in the ring and start the next frame"""
+        row = self.frames % self.size
+        self.history[row] = self.current
+        self.frame_numbers[row] = self.frames
+        self.frames += 1
+        self.current = [0.0] * len(self.phases)
+
+    def recorded(self):
+        """(frame numbers, seconds per phase) of the frames still in the ring, oldest first"""
+        if self.frames <= self.size:
+            return self.frame_numbers[:self.frames], self.history[:self.frames]
+        order = np.roll(np.arange(self.size), -(self.frames % self.size))
+        return self.frame_numbers[order], self.history[order]
+
+    def averages(self, frames=60):
+        """Mean milliseconds per phase over the last few frames"""
+        count = min(frames, self.frames, self.size)
+        if count == 0:
+            return {phase: 0.0 for phase in self.phases}
+        rows = (self.frames - 1 - np.arange(count)) % self.size
+        means = self.history[rows].mean(axis=0) * 1000
+        return dict(zip(self.phases, means.tolist()))
+
+    def export(self, path):
+        """Write the recorded frames as CSV, or JSON if path ends in .json (milliseconds)"""
+        frame_numbers, seconds = self.recorded()
+        milliseconds = seconds * 1000
+        if path.endswith(".json"):
+            with open(path, "w") as profile_file:
+                json.dump({
+                    "phases": self.phases,
+                    "frames": frame_numbers.tolist(),
+                    "ms": {phase: milliseconds[:, index].round(4).tolist()
+                           for index, phase in enumerate(self.phases)},
+                    "mean_ms": {phase: round(float(milliseconds[:, index].mean()), 4) if len(milliseconds) else 0.0
+                                for index, phase in enumerate(self.phases)},
+                }, profile_file, indent=1)
+        else:
+            with open(path, "w", newline="") as profile_file:
+                writer = csv.writer(profile_file)
+                writer.writerow(["frame"] + [phase + "_ms" for phase in self.phases])
+                for frame, row in zip(frame_numbers.tolist(), milliseconds.round(4).tolist()):
+                    writer.writerow([frame] + row)
@@ -0,0 +1,158 @@
+"""Record a run's seed and inputs, and replay it headless to check it plays out the same.
+
+A replay file holds everything needed to rebuild a run from scratch - the
+world's seed, tick rate and swarm size, the parameters of a generated
+level and the play area, every player move with the tick it arrived on -
+plus a hash of the game state after every tick. Replaying steps a fresh
+GameWorld with no window or sound, as fast as it will go, and reports
+the first tick whose state differs from the recording.
+
+Verify a recording (from the repository root):
+
+    python replay.py run.replay
+"""
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from dungeon import generate, MODES
+from world import GameWorld, PLAYING
+
+MAGIC = b"RGRP"
+FORMAT_VERSION = 4
+
+# magic, format version, seed, tick rate, swarm size, input count, tick count, dungeon mode
+# (0 for the fixed map, else 1 + index in MODES), map seed, map width, map height, gem density,
+# play area width and height in pixels (the whole map for a scrolling level)
+HEADER = struct.Struct("<4sHQHIIIBQIIdII")
+
+def state_hash(world):
+    """CRC32 of everything that decides how the run continues"""
+    player = world.player
+    crc = zlib.crc32(struct.pack(
+        "<5d?dIIIB", player.x, player.y, player.target_x, player.target_y, player.health,
+        player.invulnerable, player.invulnerable_timer, world.score, world.collected,
+        len(world.collectibles), world.state))
+    for enemy in world.enemies:
+        crc = zlib.crc32(struct.pack("<4d?dB", enemy.x, enemy.y, enemy.target_x, enemy.target_y,
+                                     enemy.is_moving, enemy.movement_cooldown, enemy.direction), crc)
+    swarm = world.swarm
+    if len(swarm):
+        for array in (swarm.x, swarm.y, swarm.movement_cooldown, swarm.direction):
+            crc = zlib.crc32(array.tobytes(), crc)
+    return crc
+
+
+class ReplayRecorder:
+    """Collects one run's inputs and per-tick state hashes during play"""
+
+    def __init__(self, world, swarm_size=0, dungeon=None):
+        self.seed = world.seed
+        self.tick_rate = world.tick_rate
+        self.swarm_size = swarm_size
+        self.dungeon = dungeon  # (mode, map seed, gem density) of a generated level, None for the fixed map
+        self.map_width = world.map_width
+        self.map_height = world.map_height
+        self.width = world.width
+        self.height = world.height
+        self.input_ticks = []
+        self.inputs = []  # Player move directions
+        self.hashes = []
+
+    def record_input(self, tick, direction):
+        """Log a player move that arrived before the given tick was stepped"""
+        self.input_ticks.append(tick)
+        self.inputs.append(direction)
+
+    def record_tick(self, world):
+        """Log the state hash after a step"""
+        self.hashes.append(state_hash(world))
+
+    def save(self, path):
+        mode, map_seed, gem_density = self.dungeon or (None, 0, 0.0)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.seed, self.tick_rate, self.swarm_size,
+                             len(self.inputs), len(self.hashes), MODES.index(mode) + 1 if mode else 0,
+                             map_seed, self.map_width, self.map_height, gem_density, self.width, self.height)
+        with open(path, "wb") as replay_file:
+            replay_file.write(header)
+            replay_file.write(np.array(self.input_ticks, dtype="<u4").tobytes())
+            replay_file.write(np.array(self.inputs, dtype=np.uint8).tobytes())
+            replay_file.write(np.array(self.hashes, dtype="<u4").tobytes())
+
+
+class Replay:
+    """A loaded replay file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+        magic, version = struct.unpack_from("<4sH", data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} replay file")
+
+        (_, _, self.seed, self.tick_rate, self.swarm_size, input_count, tick_count, mode, map_seed,
+         self.map_width, self.map_height, gem_density, self.width, self.height) = HEADER.unpack_from(data)
+        self.dungeon = (MODES[mode - 1], map_seed, gem_density) if mode else None  # (mode, map seed, gem density)
+        offset = HEADER.size
+        self.input_ticks = np.frombuffer(data, "<u4", input_count, offset).tolist()
+        offset += 4 * input_count
+        self.inputs = np.frombuffer(data, np.uint8, input_count, offset).tolist()
+        offset += input_count
+        self.hashes = np.frombuffer(data, "<u4", tick_count, offset).tolist()
+
+    def new_world(self):
+        """A fresh world set up exactly like the recorded one"""
+        if self.dungeon:
+            mode, map_seed, gem_density = self.dungeon
+            level = generate(self.map_width, self.map_height, map_seed, mode, gem_density)
+            world = GameWorld(level, width=self.width, height=self.height, tick_rate=self.tick_rate, seed=self.seed)
+        else:
+            world = GameWorld(width=self.width, height=self.height, tick_rate=self.tick_rate, seed=self.seed)
+        if self.swarm_size:
+            world.spawn_swarm(self.swarm_size)
+        return world
+
+    def verify(self):
+        """Step the whole run headless; returns the first tick whose state differs, or None"""
+        world = self.new_world()
+        input_ticks = self.input_ticks
+        inputs = self.inputs
+        next_input = 0
+        for tick, expected in enumerate(self.hashes):
+            # Inputs logged before this tick, in the order they arrived
+            while next_input < len(inputs) and input_ticks[next_input] <= tick:
+                world.move_player(inputs[next_input])
+                next_input += 1
+            world.step()
+            if state_hash(world) != expected:
+                return tick + 1
+            if world.state != PLAYING and tick + 1 < len(self.hashes):
+                return tick + 1
+        return None
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python replay.py FILE")
+        sys.exit(2)
+
+    replay = Replay(sys.argv[1])
+    start = time.perf_counter()
+    mismatch = replay.verify()
+    seconds = time.perf_counter() - start
+
+    ticks = len(replay.hashes)
+    print(f"{ticks} ticks ({ticks / replay.tick_rate:.0f} s of play), {len(replay.inputs)} inputs, "
+          f"seed {replay.seed}: replayed in {seconds:.2f} s")
+    if mismatch is None:
+        print("OK - every tick matches the recording")
+    else:
+        print(f"DESYNC - state differs from the recording at tick {mismatch}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
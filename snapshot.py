@@ -0,0 +1,198 @@
+"""Save and restore the complete state of a GameWorld as compact binary snapshots.
+
+The format is a fixed sequence of little-endian sections, each with a
+fixed layout, so a snapshot can be read without pickle and without
+trusting the file's contents to run code:
+
+    header          HEADER - world settings, counters and section lengths
+    level           map_height * map_width uint8 - the template reset() restores
+    game_map        map_height * map_width uint8 - the current map
+    player          PLAYER
+    random state    RANDOM_STATE - the enemies' random.Random
+    enemies         enemy_count * ENEMY
+    swarm rng       NUMPY_RNG_STATE - the swarm's PCG64 generator
+    swarm           swarm_count entries of each SWARM_ARRAYS array, one after another
+
+Remaining collectibles are the 2 cells of game_map. Caches such as the
+pathfinder's flow field aren't saved; they are rebuilt when next needed.
+"""
+import struct
+
+import numpy as np
+
+from collectibles import MapCollectibles
+from enemy import Ghost, Skeleton, Slime
+from overlay import LevelOverlay
+from swarm import ENEMY_TYPES, TYPE_SPEEDS, TYPE_ANIMATION_SPEEDS
+from world import GameWorld
+
+MAGIC = b"RGSV"
+FORMAT_VERSION = 1
+
+# magic, format version, cell size, width, height, tick rate, seed, map width, map height,
+# ticks, score, state, collected, total collectibles, enemy count, swarm count
+HEADER = struct.Struct("<4sHHIIHQIIIIBIIII")
+
+# x, y, target_x, target_y, previous_x, previous_y, is_moving, direction, frame,
+# animation_timer, health, max_health, invulnerable, invulnerable_timer
+PLAYER = struct.Struct("<6d?BBdii?d")
+
+# type, x, y, target_x, target_y, previous_x, previous_y, is_moving, direction, frame,
+# animation_timer, movement_cooldown
+ENEMY = struct.Struct("<B6d?BBdd")
+
+# random.Random: version, 624 Mersenne Twister words plus position, has gauss_next, gauss_next
+RANDOM_STATE = struct.Struct("<I625I?d")
+
+# numpy PCG64: state and increment as (high, low) 64-bit halves, has_uint32, uinteger
+NUMPY_RNG_STATE = struct.Struct("<4Q?I")
+
+# EnemySwarm arrays in file order, with their stored types
+SWARM_ARRAYS = [
+    ("type_index", "<i1"), ("x", "<f8"), ("y", "<f8"), ("previous_x", "<f8"), ("previous_y", "<f8"),
+    ("target_x", "<f8"), ("target_y", "<f8"), ("is_moving", "?"), ("movement_cooldown", "<f8"),
+    ("direction", "<i1"), ("frame", "<i1"), ("animation_timer", "<f8"),
+]
+
+ENEMY_CLASSES = {"ghost": Ghost, "skeleton": Skeleton, "slime": Slime}
+
+LOW_64_BITS = (1 << 64) - 1
+UINT16_MAX = (1 << 16) - 1
+UINT32_MAX = (1 << 32) - 1
+
+
+def save_snapshot(world):
+    """Serialize a world to bytes"""
+    if world.chunked:
+        raise ValueError("a world played from a chunk file is too big to snapshot")
+    # Settings the header stores in fixed-size fields
+    limits = (("cell size", world.cell_size, UINT16_MAX), ("play area width", world.width, UINT32_MAX),
+              ("play area height", world.height, UINT32_MAX), ("tick rate", world.tick_rate, UINT16_MAX))
+    for name, value, limit in limits:
+        if not 0 <= value <= limit:
+            raise ValueError(f"{name} {value} is too big to snapshot (at most {limit})")
+    player = world.player
+    swarm = world.swarm
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, world.cell_size, world.width, world.height, world.tick_rate,
+                    world.seed, world.map_width, world.map_height, world.ticks, world.score, world.state,
+                    world.collected, world.total_collectibles, len(world.enemies), len(swarm)),
+        world.level.tobytes(),
+        world.game_map.to_array().tobytes(),
+        PLAYER.pack(player.x, player.y, player.target_x, player.target_y, player.previous_x,
+                    player.previous_y, player.is_moving, player.direction, player.frame,
+                    player.animation_timer, player.health, player.max_health, player.invulnerable,
+                    player.invulnerable_timer),
+    ]
+
+    version, words, gauss_next = world.random.getstate()
+    parts.append(RANDOM_STATE.pack(version, *words, gauss_next is not None, gauss_next or 0.0))
+
+    for enemy in world.enemies:
+        parts.append(ENEMY.pack(ENEMY_TYPES.index(enemy.enemy_type), enemy.x, enemy.y, enemy.target_x,
+                                enemy.target_y, enemy.previous_x, enemy.previous_y, enemy.is_moving,
+                                enemy.direction, enemy.frame, enemy.animation_timer,
+                                enemy.movement_cooldown))
+
+    rng_state = swarm.rng.bit_generator.state
+    if rng_state["bit_generator"] != "PCG64":
+        raise ValueError(f"Can't save a {rng_state['bit_generator']} swarm generator")
+    state = rng_state["state"]
+    parts.append(NUMPY_RNG_STATE.pack(state["state"] >> 64, state["state"] & LOW_64_BITS,
+                                      state["inc"] >> 64, state["inc"] & LOW_64_BITS,
+                                      rng_state["has_uint32"], rng_state["uinteger"]))
+
+    for name, dtype in SWARM_ARRAYS:
+        parts.append(getattr(swarm, name).astype(dtype, copy=False).tobytes())
+    return b"".join(parts)
+
+
+def load_snapshot(data):
+    """Rebuild a world from save_snapshot() bytes"""
+    (magic, version, cell_size, width, height, tick_rate, seed, map_width, map_height, ticks, score,
+     state, collected, total_collectibles, enemy_count, swarm_count) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a game snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Snapshot format version {version} is not supported (expected {FORMAT_VERSION})")
+    offset = HEADER.size
+
+    map_size = map_width * map_height
+    level = np.frombuffer(data, np.uint8, map_size, offset).reshape(map_height, map_width).copy()
+    offset += map_size
+    world = GameWorld(level, cell_size, width, height, tick_rate, seed)
+    game_map = np.frombuffer(data, np.uint8, map_size, offset).reshape(map_height, map_width)
+    world.game_map = LevelOverlay.from_array(world.level, game_map)
+    world.map_version += 1
+    offset += map_size
+
+    world.ticks = ticks
+    world.score = score
+    world.state = state
+    world.collected = collected
+    world.total_collectibles = total_collectibles
+
+    # The remaining gems are the 2 cells of the restored map
+    world.collectibles = MapCollectibles(world.game_map, cell_size, int(np.count_nonzero(game_map == 2)),
+                                         world.set_tile)
+
+    player = world.player
+    (player.x, player.y, player.target_x, player.target_y, player.previous_x, player.previous_y,
+     player.is_moving, player.direction, player.frame, player.animation_timer, player.health,
+     player.max_health, player.invulnerable, player.invulnerable_timer) = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+
+    random_state = RANDOM_STATE.unpack_from(data, offset)
+    offset += RANDOM_STATE.size
+
+    world.enemies = []
+    for _ in range(enemy_count):
+        (type_index, x, y, target_x, target_y, previous_x, previous_y, is_moving, direction, frame,
+         animation_timer, movement_cooldown) = ENEMY.unpack_from(data, offset)
+        offset += ENEMY.size
+        enemy = ENEMY_CLASSES[ENEMY_TYPES[type_index]](x, y, cell_size, world.random)
+        enemy.set_boundaries(*world.enemy_boundaries)
+        enemy.set_navigator(world)
+        enemy.target_x, enemy.target_y = target_x, target_y
+        enemy.previous_x, enemy.previous_y = previous_x, previous_y
+        enemy.is_moving = is_moving
+        enemy.direction = direction
+        enemy.frame = frame
+        enemy.animation_timer = animation_timer
+        enemy.movement_cooldown = movement_cooldown
+        world.enemies.append(enemy)
+
+    # Set after creating the enemies, which draw their starting directions from it
+    world.random.setstate((random_state[0], random_state[1:626],
+                           random_state[627] if random_state[626] else None))
+
+    state_high, state_low, inc_high, inc_low, has_uint32, uinteger = NUMPY_RNG_STATE.unpack_from(data, offset)
+    offset += NUMPY_RNG_STATE.size
+    swarm = world.swarm
+    swarm.rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": (state_high << 64) | state_low, "inc": (inc_high << 64) | inc_low},
+        "has_uint32": int(has_uint32),
+        "uinteger": uinteger,
+    }
+
+    for name, dtype in SWARM_ARRAYS:
+        array = np.frombuffer(data, dtype, swarm_count, offset)
+        offset += array.nbytes
+        setattr(swarm, name, array.astype(getattr(swarm, name).dtype))
+    swarm.speed = TYPE_SPEEDS[swarm.type_index]
+    swarm.animation_threshold = 60 * TYPE_ANIMATION_SPEEDS[swarm.type_index]
+
+    if offset != len(data):
+        raise ValueError(f"Snapshot has {len(data) - offset} unexpected trailing bytes")
+    return world
+
+
+def write_snapshot(world, path):
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(save_snapshot(world))
+
+
+def read_snapshot(path):
+    with open(path, "rb") as snapshot_file:
+        return load_snapshot(snapshot_file.read())
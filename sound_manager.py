@@ -0,0 +1,207 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+# Folder holding the effect files (the same folder pgzero's sound loader uses)
+SOUND_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+SOUND_EXTENSIONS = (".ogg", ".wav")  # In order of preference when a sound has both
+
+CHANNEL_COUNT = 8  # Mixer channels reserved for effects
+REPEAT_WINDOW = 0.05  # Seconds within which repeats of one sound are coalesced into the first
+DUCK_TIME = 1.5  # Seconds the music stays lowered after the last ducking effect
+
+# Long, rarely played stings - in streaming mode they play from disk through the music stream
+STREAMED_SOUNDS = ("win", "game_over")
+CACHE_BYTES = 1024 * 1024  # Decoded effects kept in memory in streaming mode
+
+
+class SoundManager:
+    """Plays sound effects on a fixed pool of mixer channels.
+
+    By default load_all() decodes every effect up front. With streaming on,
+    the effects named in streamed play from their file through the music
+    stream instead of being decoded into memory, and the rest are decoded
+    the first time they play and kept in a least-recently-used cache of at
+    most cache_bytes. play() drops repeats of a sound that arrive within
+    repeat_window of the last one and, when all channels are busy,
+    replaces the effect that started longest ago, so a burst of events
+    can't pile up voices. duck_music() keeps a single restore timer on the
+    clock and pushes it back on every call instead of scheduling one per
+    effect.
+    """
+
+    def __init__(self, clock, lower_music=None, restore_music=None, sound_root=SOUND_ROOT,
+                 channels=CHANNEL_COUNT, repeat_window=REPEAT_WINDOW, duck_time=DUCK_TIME,
+                 streaming=False, streamed=STREAMED_SOUNDS, cache_bytes=CACHE_BYTES):
+        self.clock = clock  # pgzero Clock instance (clock.clock in a game) - its time drives rate limiting and the ducking timer
+        self.lower_music = lower_music  # Called when ducking starts
+        self.restore_music = restore_music  # Called when the ducking timer runs out
+        self.sound_root = sound_root
+        self.channel_count = channels
+        self.repeat_window = repeat_window
+        self.duck_time = duck_time
+        self.streaming = streaming
+        self.streamed = set(streamed) if streaming else set()
+        self.cache_bytes = cache_bytes
+
+        self.paths = {}  # Effect name -> file
+        self.sounds = OrderedDict()  # Effect name -> decoded pygame Sound, least recently played first
+        self.sound_sizes = {}  # Effect name -> bytes of decoded audio
+        self.cached_bytes = 0
+        self.bytes_per_second = 0  # Decoded audio size per second at the mixer's format
+        self.channels = []
+        self.channel_started = []  # Clock time each channel's current effect started
+        self.last_played = {}  # Effect name -> clock time it last started
+        self.now_streaming = None  # Name of the sting playing through the music stream
+        self.ducked = False
+
+        # Counters for tuning and the benchmarks
+        self.played = 0
+        self.coalesced = 0
+        self.replaced = 0
+        self.decoded = 0
+        self.evicted = 0
+
+    def find_sounds(self):
+        """Find every effect in the sound folder; returns name -> file for those decoded up front.
+
+        With streaming on that is none of them: stings play from disk and the
+        other effects are decoded on first use, so nothing is preloaded.
+        """
+        for file_name in sorted(os.listdir(self.sound_root)):
+            name, extension = os.path.splitext(file_name)
+            if extension not in SOUND_EXTENSIONS:
+                continue
+            current = self.paths.get(name)
+            if current is None or SOUND_EXTENSIONS.index(extension) < SOUND_EXTENSIONS.index(os.path.splitext(current)[1]):
+                self.paths[name] = os.path.join(self.sound_root, file_name)
+        if self.streaming:
+            return {}
+        return dict(self.paths)
+
+    def load_all(self, preloaded=None):
+        """Reserve the channel pool and take in the effects.
+
+        preloaded maps names to Sounds already decoded (e.g. by the asset
+        preloader). Without streaming, any other effect is decoded now.
+        """
+        mixer_format = pygame.mixer.get_init()
+        if not mixer_format:
+            print("Sound effects disabled: the mixer is not initialized")
+            return
+        frequency, bits, mixer_channels = mixer_format
+        self.bytes_per_second = frequency * mixer_channels * abs(bits) // 8
+        if not self.paths:
+            self.find_sounds()
+
+        # Reserved channels are only used when asked for by number, so other playback can't take them
+        if pygame.mixer.get_num_channels() < self.channel_count:
+            pygame.mixer.set_num_channels(self.channel_count)
+        pygame.mixer.set_reserved(self.channel_count)
+        self.channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+        self.channel_started = [0.0] * self.channel_count
+
+        for name, sound in (preloaded or {}).items():
+            if name in self.paths and name not in self.streamed:
+                self.add(name, sound)
+        if not self.streaming:
+            for name in self.paths:
+                self.get(name)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def get(self, name):
+        """The decoded Sound for an effect, decoding it on first use; None if it can't be loaded"""
+        sound = self.sounds.get(name)
+        if sound is not None:
+            self.sounds.move_to_end(name)
+            return sound
+
+        try:
+            sound = pygame.mixer.Sound(self.paths[name])
+        except Exception as e:
+            print(f"Error loading sound {self.paths[name]}: {e}")
+            return None
+        self.decoded += 1
+        self.add(name, sound)
+        return sound
+
+    def add(self, name, sound):
+        """Keep a decoded effect, evicting the least recently played ones if over the streaming budget"""
+        size = int(sound.get_length() * self.bytes_per_second)
+        self.sounds[name] = sound
+        self.sound_sizes[name] = size
+        self.cached_bytes += size
+
+        # Only streaming mode has a budget; a channel keeps its own reference to an evicted sound still playing
+        if self.streaming:
+            while self.cached_bytes > self.cache_bytes and len(self.sounds) > 1:
+                evicted, _ = self.sounds.popitem(last=False)
+                self.cached_bytes -= self.sound_sizes.pop(evicted)
+                self.evicted += 1
+
+    def play(self, name):
+        """Play an effect; returns False if it was coalesced into a recent repeat or can't be played"""
+        if name not in self.paths or not self.channels:
+            return False
+
+        now = self.clock.t
+        last = self.last_played.get(name)
+        if last is not None and now - last < self.repeat_window:
+            self.coalesced += 1
+            return False
+
+        if name in self.streamed:
+            self.stream(name)
+        else:
+            sound = self.get(name)
+            if sound is None:
+                return False
+            index = self.free_channel()
+            self.channels[index].play(sound)
+            self.channel_started[index] = now
+        self.last_played[name] = now
+        self.played += 1
+        return True
+
+    def stream(self, name):
+        """Play a sting from its file through the music stream, replacing whatever that was playing"""
+        pygame.mixer.music.load(self.paths[name])
+        pygame.mixer.music.set_volume(1.0)
+        pygame.mixer.music.play()
+        self.now_streaming = name
+
+    def free_channel(self):
+        """Index of an idle channel, or of the one whose effect started longest ago"""
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        self.replaced += 1
+        return self.channel_started.index(min(self.channel_started))
+
+    def stop(self, name):
+        """Stop every playing instance of an effect"""
+        if name in self.streamed:
+            if self.now_streaming == name:
+                pygame.mixer.music.stop()
+                self.now_streaming = None
+            return
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.stop()
+
+    def duck_music(self):
+        """Lower the music until duck_time after the latest call"""
+        if not self.ducked:
+            self.ducked = True
+            if self.lower_music:
+                self.lower_music()
+        # Pushes back the pending restore rather than adding another one
+        self.clock.schedule_unique(self.end_duck, self.duck_time)
+
+    def end_duck(self):
+        self.ducked = False
+        if self.restore_music:
+            self.restore_music()
@@ -0,0 +1,57 @@
+import os
+
+import pygame
+
+from direction import DIRECTION_NAMES
+
+# Folder holding the per-frame PNGs (the same folder pgzero's image loader uses)
+IMAGE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+# Image name prefix for every animated sprite kind, relative to IMAGE_ROOT
+SPRITE_PREFIXES = {
+    "player": "player/player",
+    "ghost": "enemies/ghost/ghost",
+    "skeleton": "enemies/skeleton/skeleton",
+    "slime": "enemies/slime/slime",
+}
+
+FRAMES_PER_DIRECTION = 4
+
+
+def sprite_name(kind, direction, frame):
+    """Image name of one animation frame, e.g. 'enemies/ghost/ghost_up_0'"""
+    return f"{SPRITE_PREFIXES[kind]}_{DIRECTION_NAMES[direction]}_{frame}"
+
+
+def load_image(name, image_root=IMAGE_ROOT):
+    """Load one PNG from the images folder, converted for fast blitting if a display exists"""
+    surface = pygame.image.load(os.path.join(image_root, name + ".png"))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    return surface
+
+
+class SpriteRegistry:
+    """Every direction x frame surface for the player and enemies, loaded once.
+
+    frames(kind) returns a table indexed as table[direction][frame], so
+    entities can blit without building image names each frame.
+    """
+
+    def __init__(self, load=load_image):
+        self.load = load
+        self.tables = {}
+
+    def load_all(self):
+        """Load the frame tables for every sprite kind"""
+        for kind in SPRITE_PREFIXES:
+            self.frames(kind)
+
+    def frames(self, kind):
+        table = self.tables.get(kind)
+        if table is None:
+            table = [[self.load(sprite_name(kind, direction, frame))
+                      for frame in range(FRAMES_PER_DIRECTION)]
+                     for direction in range(len(DIRECTION_NAMES))]
+            self.tables[kind] = table
+        return table
@@ -0,0 +1,217 @@
+import numpy as np
+
+from direction import UP, DOWN, LEFT, RIGHT
+
+# Per-type parameters, matching the Ghost, Skeleton and Slime classes
+ENEMY_TYPES = ["ghost", "skeleton", "slime"]
+TYPE_SPEEDS = np.array([1.5, 2.0, 1.0])
+TYPE_ANIMATION_SPEEDS = np.array([0.12, 0.1, 0.08])
+TYPE_CHASES = np.array([False, True, False])  # Skeletons hunt the player
+
+FRAMES_PER_DIRECTION = 4
+
+
+def frame_sizes(frame_tables):
+    """(widths, heights) arrays of each type's largest frame, for culling the swarm in draw()"""
+    return np.array([np.max([sprite.get_size() for frames in table for sprite in frames], axis=0)
+                     for table in frame_tables]).T
+
+
+class EnemySwarm:
+    """Many enemies stored as NumPy arrays and advanced in one vectorized step.
+
+    Each enemy behaves like an Enemy object - cell-to-cell moves with a
+    cooldown between them, wandering or (for chasing types) following the
+    world's flow field - but the whole swarm is updated with a few array
+    operations instead of a Python loop, so thousands of enemies fit in a
+    frame.
+    """
+
+    def __init__(self, cell_size, min_x, max_x, min_y, max_y, rng=None):
+        self.cell_size = cell_size
+        # Movement boundaries, the same for every enemy
+        self.min_x = min_x
+        self.max_x = max_x
+        self.min_y = min_y
+        self.max_y = max_y
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.type_index = np.zeros(0, dtype=np.int8)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.previous_x = np.zeros(0)  # Positions at the start of the last tick, for interpolated drawing
+        self.previous_y = np.zeros(0)
+        self.target_x = np.zeros(0)
+        self.target_y = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.is_moving = np.zeros(0, dtype=bool)
+        self.movement_cooldown = np.zeros(0)
+        self.direction = np.zeros(0, dtype=np.int8)
+        self.frame = np.zeros(0, dtype=np.int8)
+        self.animation_timer = np.zeros(0)
+        self.animation_threshold = np.zeros(0)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, enemy_type, xs, ys):
+        """Add enemies of one type at the given pixel positions"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        count = len(xs)
+        type_index = ENEMY_TYPES.index(enemy_type)
+
+        self.type_index = np.concatenate([self.type_index, np.full(count, type_index, dtype=np.int8)])
+        self.x = np.concatenate([self.x, xs])
+        self.y = np.concatenate([self.y, ys])
+        self.previous_x = np.concatenate([self.previous_x, xs])
+        self.previous_y = np.concatenate([self.previous_y, ys])
+        self.target_x = np.concatenate([self.target_x, xs])
+        self.target_y = np.concatenate([self.target_y, ys])
+        self.speed = np.concatenate([self.speed, np.full(count, TYPE_SPEEDS[type_index])])
+        self.is_moving = np.concatenate([self.is_moving, np.zeros(count, dtype=bool)])
+        self.movement_cooldown = np.concatenate([self.movement_cooldown, np.zeros(count)])
+        self.direction = np.concatenate([self.direction, self.rng.integers(0, 4, count).astype(np.int8)])
+        self.frame = np.concatenate([self.frame, np.zeros(count, dtype=np.int8)])
+        self.animation_timer = np.concatenate([self.animation_timer, np.zeros(count)])
+        self.animation_threshold = np.concatenate(
+            [self.animation_threshold, np.full(count, 60 * TYPE_ANIMATION_SPEEDS[type_index])])
+
+    def change_direction(self, mask, valid_moves, chase_directions=None):
+        """Start a one-cell move for every enemy in mask, as Enemy.change_direction does"""
+        indexes = np.nonzero(mask)[0]
+        if len(indexes) == 0:
+            return
+        x = self.x[indexes]
+        y = self.y[indexes]
+        cell_size = self.cell_size
+
+        # Each direction's target, as (n, 4) tables - only the axis being moved along changes
+        targets_x = np.repeat(self.target_x[indexes][:, None], 4, axis=1)
+        targets_y = np.repeat(self.target_y[indexes][:, None], 4, axis=1)
+        targets_y[:, UP] = y - cell_size
+        targets_y[:, DOWN] = y + cell_size
+        targets_x[:, LEFT] = x - cell_size
+        targets_x[:, RIGHT] = x + cell_size
+
+        # Which directions stay inside the boundaries and off walls
+        allowed = np.empty((len(indexes), 4), dtype=bool)
+        allowed[:, UP] = targets_y[:, UP] >= self.min_y
+        allowed[:, DOWN] = targets_y[:, DOWN] <= self.max_y
+        allowed[:, LEFT] = targets_x[:, LEFT] >= self.min_x
+        allowed[:, RIGHT] = targets_x[:, RIGHT] <= self.max_x
+        allowed &= valid_moves(targets_x.ravel(), targets_y.ravel()).reshape(allowed.shape)
+
+        # Pick uniformly among the allowed directions...
+        scores = np.where(allowed, self.rng.random(allowed.shape), -1.0)
+        # ...unless a chaser's flow field direction is allowed
+        if chase_directions is not None:
+            chasers = np.nonzero(TYPE_CHASES[self.type_index[indexes]])[0]
+            if len(chasers):
+                preferred = chase_directions(x[chasers], y[chasers]).astype(np.intp)
+                follow = preferred >= 0
+                follow[follow] = allowed[chasers[follow], preferred[follow]]
+                scores[chasers[follow], preferred[follow]] = 2.0
+
+        # Enemies boxed in on all sides stay put
+        direction = scores.argmax(axis=1)
+        can_move = allowed.any(axis=1)
+        self.is_moving[indexes[~can_move]] = False
+        rows = np.nonzero(can_move)[0]
+        indexes = indexes[rows]
+        direction = direction[rows]
+
+        self.direction[indexes] = direction
+        self.target_x[indexes] = targets_x[rows, direction]
+        self.target_y[indexes] = targets_y[rows, direction]
+        self.is_moving[indexes] = True
+
+    def step(self, valid_moves, chase_directions=None, dt=1.0):
+        """Advance every enemy by one tick.
+
+        valid_moves(xs, ys) is the world's batched walkability check, and
+        chase_directions(xs, ys) gives the flow field direction toward the
+        player for chasing types; enemies heading for an invalid target pick
+        a new direction first. dt is the tick length in 60 Hz frames, as for
+        Enemy.update().
+        """
+        if len(self) == 0:
+            return
+        self.previous_x[:] = self.x
+        self.previous_y[:] = self.y
+        step = self.speed * dt
+
+        # First check if each enemy's target position is valid
+        invalid = self.is_moving & ~valid_moves(self.target_x, self.target_y)
+        self.change_direction(invalid, valid_moves, chase_directions)
+
+        self.animation_timer += dt
+
+        # Enemies that reached their target stop and wait 0.5-1.5 seconds
+        dx = self.target_x - self.x
+        dy = self.target_y - self.y
+        arrived = self.is_moving & (np.abs(dx) < step) & (np.abs(dy) < step)
+        self.x[arrived] = self.target_x[arrived]
+        self.y[arrived] = self.target_y[arrived]
+        self.is_moving[arrived] = False
+        self.movement_cooldown[arrived] = self.rng.integers(30, 91, int(arrived.sum()))
+
+        # Enemies still moving take a step of their speed toward the target
+        moving = self.is_moving
+        distance = np.hypot(dx, dy)
+        distance[distance == 0] = 1
+        self.x += np.where(moving, dx / distance * step, 0)
+        self.y += np.where(moving, dy / distance * step, 0)
+
+        # Idle enemies (including ones that just arrived) count down their cooldown, then pick a new direction
+        idle = ~moving
+        waiting = idle & (self.movement_cooldown > 0)
+        self.movement_cooldown[waiting] -= dt
+        self.change_direction(idle & ~waiting, valid_moves, chase_directions)
+
+        # Update animation frames
+        animate = self.animation_timer >= self.animation_threshold
+        self.frame[animate] = (self.frame[animate] + 1) % FRAMES_PER_DIRECTION
+        self.animation_timer[animate] = 0
+
+    def collisions(self, rect):
+        """Bool array of the enemies whose hitbox overlaps rect"""
+        inset = 10
+        size = self.cell_size - 20
+        left = (self.x + inset).astype(np.int64)
+        top = (self.y + inset).astype(np.int64)
+        return ((left < rect.right) & (rect.left < left + size) &
+                (top < rect.bottom) & (rect.top < top + size))
+
+    def draw_positions(self, alpha=1.0):
+        """Integer (xs, ys) between the last two ticks - alpha 0 is the previous tick, 1 the current one"""
+        if alpha == 1.0:
+            return self.x.astype(np.int64), self.y.astype(np.int64)
+        xs = self.previous_x + (self.x - self.previous_x) * alpha
+        ys = self.previous_y + (self.y - self.previous_y) * alpha
+        return xs.astype(np.int64), ys.astype(np.int64)
+
+    def draw(self, screen, frame_tables, alpha=1.0, view=None, sizes=None):
+        """Blit the enemies in one batch; frame_tables[type_index] is a [direction][frame] table.
+
+        With a view (a Rect of world pixels, e.g. a Camera's), only enemies
+        overlapping it are drawn, relative to its top-left corner. It needs
+        the tables' sizes, as returned by frame_sizes().
+        """
+        if len(self) == 0:
+            return
+        xs, ys = self.draw_positions(alpha)
+        type_index, direction, frame = self.type_index, self.direction, self.frame
+        if view is not None:
+            # Sprites are bigger than a cell - test each type's largest frame
+            widths, heights = sizes
+            widths = widths[type_index]
+            heights = heights[type_index]
+            visible = np.nonzero((xs < view.right) & (xs + widths > view.left) &
+                                 (ys < view.bottom) & (ys + heights > view.top))[0]
+            xs = xs[visible] - view.x
+            ys = ys[visible] - view.y
+            type_index, direction, frame = type_index[visible], direction[visible], frame[visible]
+        screen.surface.blits([(frame_tables[t][d][f], (x, y)) for t, d, f, x, y in zip(
+            type_index.tolist(), direction.tolist(), frame.tolist(),
+            xs.tolist(), ys.tolist())], False)
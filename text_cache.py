@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+from pgzero import ptext
+
+# Where the position given to draw() sits on the text, as fractions of its width and height
+TOP_LEFT = (0, 0)
+TOP_CENTER = (0.5, 0)
+TOP_RIGHT = (1, 0)
+CENTER = (0.5, 0.5)
+
+
+class TextCache:
+    """Rendered text surfaces, kept for reuse with least-recently-used eviction.
+
+    Entries are keyed by (text, font size, color, anchor), so a HUD line is
+    rasterized once when its value changes and every later frame is a
+    single blit. Output matches screen.draw.text with the same arguments.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (surface, width, height)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, text, fontsize=None, color="white", anchor=TOP_LEFT):
+        """Rendered (surface, width, height) for the text, rendering it on a miss"""
+        key = (text, fontsize, color, anchor)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        # Render through ptext, as screen.draw.text does, but keep the surface here instead
+        surface = ptext.getsurf(text, fontsize=fontsize, color=color, cache=False)
+        entry = (surface, surface.get_width(), surface.get_height())
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def draw(self, screen, text, pos, fontsize=None, color="white", anchor=TOP_LEFT):
+        """Blit text with its anchor point at pos"""
+        surface, width, height = self.get(text, fontsize, color, anchor)
+        x, y = pos
+        screen.surface.blit(surface, (int(round(x - anchor[0] * width)), int(round(y - anchor[1] * height))))
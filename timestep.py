@@ -0,0 +1,34 @@
+class FixedTimestep:
+    """Turns real frame times into a whole number of fixed-length logic ticks.
+
+    Each frame's delta time goes into an accumulator and advance() returns
+    how many ticks of 1/rate seconds it now covers, so the game runs at the
+    same speed however fast frames are drawn. A slow frame catches up with
+    at most max_ticks ticks; anything beyond that is dropped rather than
+    letting the game fall further and further behind. alpha is how far the
+    leftover time reaches into the next tick, for interpolating draws.
+    """
+
+    def __init__(self, rate, max_ticks=5):
+        self.rate = rate
+        self.tick_length = 1.0 / rate
+        self.max_ticks = max_ticks
+        self.reset()
+
+    def reset(self):
+        """Forget any unspent time, e.g. while the game is paused in the menu"""
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    def advance(self, dt):
+        """Add dt seconds and return the number of ticks to run"""
+        self.accumulator += dt
+        # Tolerate float error so a frame of exactly one tick runs one tick
+        ticks = int(self.accumulator * self.rate + 1e-6)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator = max(self.accumulator - ticks * self.tick_length, 0.0)
+        self.alpha = min(self.accumulator * self.rate, 1.0)
+        return ticks
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TransformCache:
+    """Scaled and rotated variants of images, kept for reuse with least-recently-used eviction.
+
+    Entries are keyed by (image name, scale, angle), so every sprite drawn
+    with the same image and transform shares one surface, which is only
+    computed the first time it's asked for. The untransformed image is
+    returned as is.
+    """
+
+    def __init__(self, load, max_entries=128):
+        self.load = load  # load(name) -> Surface, e.g. pgzero's images.load
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (name, scale, angle) -> Surface
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, name, scale=1.0, angle=0):
+        """The image scaled by scale and rotated angle degrees counterclockwise, computing it on a miss"""
+        key = (name, scale, angle)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+
+        surface = self.load(name)
+        if scale != 1.0:
+            size = (max(1, round(surface.get_width() * scale)), max(1, round(surface.get_height() * scale)))
+            # smoothscale needs 24 or 32 bit pixels; anything else falls back to nearest neighbour
+            if surface.get_bitsize() in (24, 32):
+                surface = pygame.transform.smoothscale(surface, size)
+            else:
+                surface = pygame.transform.scale(surface, size)
+        if angle % 360:
+            surface = pygame.transform.rotate(surface, angle)
+
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
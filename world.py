@@ -0,0 +1,329 @@
+import random
+
+import numpy as np
+
+from chunks import ChunkedLevel, PREFETCH_MARGIN
+from collectibles import MapCollectibles
+from direction import UP, DOWN, LEFT, RIGHT
+from overlay import LevelOverlay, base_level, gem_count
+from pathfinding import Pathfinder
+from profiler import PLAYER_UPDATE, COLLECTIBLE_SCAN, ENEMY_UPDATE
+from player import Player
+from enemy import Ghost, Skeleton, Slime
+from swarm import EnemySwarm, ENEMY_TYPES
+
+# Play area size in pixels (matches the game window)
+WIDTH = 800
+HEIGHT = 600
+
+# Cell size for grid-based movement
+CELL_SIZE = 50
+
+# Game states
+MENU = 0
+PLAYING = 1
+GAME_OVER = 2
+WIN = 3
+
+# Logic ticks per second that movement speeds and timers are tuned for
+BASE_TICK_RATE = 60
+
+# How far (in cells) chasing enemies can track the player through the maze
+CHASE_DISTANCE = 40
+
+# Starting cells (grid_x, grid_y) - a level must have floor on all of them
+PLAYER_START = (2, 2)
+ENEMY_STARTS = [(5, 5), (10, 3), (8, 8)]  # Ghost, Skeleton, Slime
+
+# Events reported by GameWorld.step() - named after the sound they trigger
+GEM_COLLECTED = "gem_collect"
+PLAYER_HURT = "hurt"
+
+# Original map - used as a template to reset the game
+# 0 = empty space, 1 = wall, 2 = collectible
+ORIGINAL_MAP = [
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 0, 0, 1],
+    [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+    [1, 0, 0, 1, 0, 2, 0, 0, 0, 0, 2, 0, 1, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 1, 0, 2, 0, 0, 0, 0, 2, 0, 1, 0, 0, 1],
+    [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+    [1, 0, 0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+]
+
+# The fixed map as one read-only array, shared by every world that plays it
+ORIGINAL_LEVEL = base_level(ORIGINAL_MAP)
+
+
+class GameWorld:
+    """All game logic and state, with no dependency on pgzero.
+
+    The world can be stepped without a window, mixer or clock, so it can be
+    driven by the pgzero frontend in main.py or run headless by scripts.
+    """
+
+    def __init__(self, level=ORIGINAL_LEVEL, cell_size=CELL_SIZE, width=WIDTH, height=HEIGHT,
+                 tick_rate=BASE_TICK_RATE, seed=None):
+        # The level is kept as a compact read-only uint8 array indexed [grid_y, grid_x], shared with
+        # any other world playing it, or read from disk a chunk at a time when it's a ChunkedLevel
+        self.chunked = isinstance(level, ChunkedLevel)
+        self.level = level if self.chunked else base_level(level)
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+
+        # step() advances the game by 1/tick_rate seconds; entities scale their per-frame speeds by this
+        self.tick_rate = tick_rate
+        self.tick_scale = BASE_TICK_RATE / tick_rate
+
+        # Every random choice comes from this seed, so a run can be replayed exactly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+
+        # Map dimensions in cells
+        self.map_height, self.map_width = self.level.shape
+
+        # Bumped whenever walls change so renderers know to rebuild cached layers
+        self.map_version = 0
+
+        # Flow field toward the player for chasing enemies
+        self.pathfinder = Pathfinder(self, max_distance=CHASE_DISTANCE)
+
+        # FrameProfiler that step() reports its phases to, or None when not profiling
+        self.profiler = None
+
+        self.reset()
+
+    def reset_map(self):
+        """Reset the game map to its original state.
+
+        The map is an overlay of the cells this run changed on top of the
+        level (or a fresh view of a chunked level, which keeps its changes
+        the same way), so resetting drops the last run's changes instead of
+        copying the level.
+        """
+        self.game_map = self.level.copy() if self.chunked else LevelOverlay(self.level)
+        self.map_version += 1
+
+    def set_tile(self, grid_x, grid_y, value):
+        """Change a single map cell"""
+        old_value = self.game_map[grid_y, grid_x]
+        self.game_map[grid_y, grid_x] = value
+        # Only walls are part of the static map layer
+        if (old_value == 1) != (value == 1):
+            self.map_version += 1
+
+    def reset(self):
+        """Start a fresh run: map, player, enemies, collectibles and score"""
+        cell_size = self.cell_size
+
+        # Reset map to original state
+        self.reset_map()
+
+        # Restart the random sequences so every reset replays the same run
+        self.random = random.Random(self.seed)
+        self.ticks = 0  # Ticks stepped since the reset
+
+        # Reset collectibles and score - gems are read straight from the map's cells, so the level is
+        # their index, shared with every world playing it, and the ones this run collected are its changes
+        total = self.level.file.gem_count if self.chunked else gem_count(self.level)
+        self.collectibles = MapCollectibles(self.game_map, cell_size, total, self.set_tile)
+        self.collected = 0
+        self.score = 0
+        self.state = PLAYING
+
+        # Create player at starting position
+        self.player = Player(PLAYER_START[0] * cell_size, PLAYER_START[1] * cell_size, cell_size)
+
+        # Create enemies
+        self.enemies = [
+            enemy_class(grid_x * cell_size, grid_y * cell_size, cell_size, self.random)
+            for enemy_class, (grid_x, grid_y) in zip((Ghost, Skeleton, Slime), ENEMY_STARTS)
+        ]
+
+        # Only allow enemies to move within the playable area
+        self.enemy_boundaries = (1 * cell_size, (self.map_width - 2) * cell_size,
+                                 1 * cell_size, (self.map_height - 2) * cell_size)
+        for enemy in self.enemies:
+            enemy.set_boundaries(*self.enemy_boundaries)
+            enemy.set_navigator(self)
+
+        # Bulk enemies live in a vectorized swarm, empty unless spawn_swarm() is called
+        self.swarm = EnemySwarm(cell_size, *self.enemy_boundaries, rng=np.random.default_rng(self.seed))
+
+        self.total_collectibles = len(self.collectibles)
+
+    def spawn_swarm(self, count):
+        """Add up to count random swarm enemies on free cells inside the enemy boundaries.
+
+        Enemies never start on or next to the player, and there are no more
+        of them than free cells. Returns the number added.
+        """
+        cell_size = self.cell_size
+        # Only cells inside the play area can be free, so only those are read from the map
+        columns = min(self.map_width - 1, -(-min(self.width - cell_size, self.map_width * cell_size) // cell_size))
+        rows = min(self.map_height - 1, -(-min(self.height - cell_size, self.map_height * cell_size) // cell_size))
+        if self.chunked:
+            # A chunked level can be far too big to read whole - spawn in the first chunk only
+            columns = min(columns, self.level.chunk_size)
+            rows = min(rows, self.level.chunk_size)
+        grid_ys, grid_xs = np.nonzero(self.game_map[1:rows, 1:columns] != 1)
+        xs = (grid_xs + 1) * cell_size
+        ys = (grid_ys + 1) * cell_size
+        # Keep clear of the player's cell and its neighbours, or a swarm enemy could hit on the first tick
+        player_x, player_y = round(self.player.x / cell_size), round(self.player.y / cell_size)
+        clear = (np.abs(grid_xs + 1 - player_x) > 1) | (np.abs(grid_ys + 1 - player_y) > 1)
+        free = np.nonzero(self.valid_moves(xs, ys) & clear)[0]
+
+        # No more enemies than free cells, and none at all if the play area has no room
+        count = min(count, len(free))
+        if count == 0:
+            return 0
+        rng = self.swarm.rng
+        cells = free[rng.integers(0, len(free), count)]
+        types = rng.integers(0, len(ENEMY_TYPES), count)
+        for type_index, enemy_type in enumerate(ENEMY_TYPES):
+            chosen = cells[types == type_index]
+            self.swarm.add(enemy_type, xs[chosen], ys[chosen])
+        return count
+
+    def move_player(self, direction):
+        """Start a one-cell player move; ignored (returns False) while the player is still moving"""
+        player = self.player
+        if player.is_moving:
+            return False
+        if direction == UP:
+            player.move_up()
+        elif direction == DOWN:
+            player.move_down()
+        elif direction == LEFT:
+            player.move_left()
+        elif direction == RIGHT:
+            player.move_right()
+        return True
+
+    def valid_moves(self, xs, ys):
+        """Check many pixel positions at once - returns a bool array"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        cell_size = self.cell_size
+
+        # First, check play area and map boundaries directly
+        max_x = min(self.width - cell_size, self.map_width * cell_size)
+        max_y = min(self.height - cell_size, self.map_height * cell_size)
+        valid = (xs >= 0) & (xs < max_x) & (ys >= 0) & (ys < max_y)
+
+        # Then, convert pixel coordinates to grid coordinates (clipped so
+        # out-of-bounds positions still index safely)
+        grid_x = (xs // cell_size).astype(np.intp)
+        grid_y = (ys // cell_size).astype(np.intp)
+        np.minimum(np.maximum(grid_x, 0, out=grid_x), self.map_width - 1, out=grid_x)
+        np.minimum(np.maximum(grid_y, 0, out=grid_y), self.map_height - 1, out=grid_y)
+
+        # Finally check that the cell is not a wall - while no wall was added or removed this run
+        # (collecting gems never does), the shared level answers that without the run's changes
+        game_map = self.game_map
+        if not self.chunked and game_map.unchanged(1):
+            game_map = game_map.base
+        return valid & (game_map[grid_y, grid_x] != 1)  # Allow collectibles (2) or empty space (0)
+
+    def is_valid_move(self, x, y):
+        return bool(self.valid_moves((x,), (y,))[0])
+
+    def chase_directions(self, xs, ys):
+        """Direction toward the player from many pixel positions (NO_DIRECTION if out of range)"""
+        cell_size = self.cell_size
+        grid_xs = np.rint(np.asarray(xs, dtype=np.float64) / cell_size)
+        grid_ys = np.rint(np.asarray(ys, dtype=np.float64) / cell_size)
+        return self.pathfinder.directions_at(grid_xs, grid_ys)
+
+    def chase_direction(self, x, y):
+        return int(self.chase_directions((x,), (y,))[0])
+
+    def step(self):
+        """Advance the simulation by one tick of 1/tick_rate seconds.
+
+        Returns a list of events (GEM_COLLECTED, PLAYER_HURT) that happened
+        during the tick so the frontend can play sounds for them.
+        """
+        events = []
+        if self.state != PLAYING:
+            return events
+
+        self.ticks += 1
+        player = self.player
+        profiler = self.profiler
+        if profiler:
+            profiler.start()
+
+        # Check every entity's target position in one batch, before anything moves
+        entities = [player] + self.enemies
+        valid = self.valid_moves([entity.target_x for entity in entities],
+                                 [entity.target_y for entity in entities]).tolist()
+
+        # First check if the player's target position is valid before updating
+        if player.is_moving and not valid[0]:
+            player.cancel_movement()
+
+        # Now update player with validated movement
+        player.update(self.tick_scale)
+
+        # Chasers path toward the player's cell - the flow field is only rebuilt when it changes
+        player_cell = (round(player.x / self.cell_size), round(player.y / self.cell_size))
+        self.pathfinder.set_goal(player_cell)
+        if self.chunked:
+            self.game_map.prefetch(*player_cell, PREFETCH_MARGIN)
+        if profiler:
+            profiler.stop(PLAYER_UPDATE)
+            profiler.start()
+
+        # Check for collectible collection - only the cells under the player are looked at, and
+        # the collected gem's cell is cleared through set_tile()
+        if self.collectibles.pickup(player.get_rect()) is not None:
+            self.score += 100  # 100 points per gem
+            self.collected += 1
+            events.append(GEM_COLLECTED)
+        if profiler:
+            profiler.stop(COLLECTIBLE_SCAN)
+            profiler.start()
+
+        # Update enemies
+        for enemy, enemy_valid in zip(self.enemies, valid[1:]):
+            # First check if the enemy's target position is valid
+            if enemy.is_moving and not enemy_valid:
+                enemy.change_direction()
+
+            # Now update enemy with validated movement
+            enemy.update(self.tick_scale)
+
+            # Check for collision between player and enemy
+            if enemy.collides_with(player):
+                if player.take_damage():  # Only report if damage was actually taken
+                    events.append(PLAYER_HURT)
+
+                # Check if player is dead
+                if player.is_dead():
+                    self.state = GAME_OVER
+
+        # Update the swarm all at once, then check it against the player
+        if len(self.swarm):
+            self.swarm.step(self.valid_moves, self.chase_directions, self.tick_scale)
+            if self.swarm.collisions(player.get_rect()).any():
+                if player.take_damage():
+                    events.append(PLAYER_HURT)
+                if player.is_dead():
+                    self.state = GAME_OVER
+        if profiler:
+            profiler.stop(ENEMY_UPDATE)
+
+        # Check win condition
+        if self.collected >= self.total_collectibles:
+            self.state = WIN
+
+        return events